@@ -0,0 +1,353 @@
+"""
+Peter Zhong & Tony Song
+CSE 163 Final Project
+This file implements mergeable per-player accumulators for the second
+and third research questions. PlayerStats keeps the number of games, the
+gold and damage sums and the mean and sum of squared deviations (M2) of
+the damage per gold ratio of every player. RollingStats keeps the mean
+and variance of that ratio over the last games of every player, game by
+game. AllStarStats keeps the sums of games, win rates and KDAs of every
+player and position and the number of times every player shows up in
+each region. All of them let chunks of a file be added one at a time,
+and PlayerStats and AllStarStats let partial results be merged. The
+state of a RollingStats can be saved with the number of rows of the
+table it covers, so a later run only adds the rows appended since.
+"""
+
+import os
+import pickle
+import numpy as np
+import pandas as pd
+import memo
+
+COLUMNS = ['Number_of_Games', 'Gold', 'Damage', 'Ratios', 'Mean', 'M2']
+KDA_COLUMNS = ['Games', 'Win rate', 'KDA', 'Rows', 'First']
+ROLLING_COLUMNS = ['Player', 'Match', 'Dmg_Per_Gold']
+WINDOW = 10
+
+
+class PlayerStats:
+    """
+    Accumulates per-player statistics chunk by chunk. The mean and the sum
+    of squared deviations (M2) of every chunk are computed in two passes
+    over its games with bincount, and chunks and other partial results
+    are merged with the parallel formula of Chan et al. Games whose damage per gold ratio is undefined (0 damage on 0 gold)
+    count as games but are left out of the ratio's mean and variance,
+    the same way pandas skips missing values.
+    """
+
+    def __init__(self):
+        self.table = pd.DataFrame(columns=COLUMNS, dtype=float)
+
+    def add(self, players):
+        """
+        Takes a dataframe with columns named Player, Gold and Damage
+        (one row per player per game) and adds its games to the
+        statistics. A categorical Player column is grouped on its codes.
+        """
+        if isinstance(players['Player'].dtype, pd.CategoricalDtype):
+            codes = players['Player'].cat.codes.to_numpy()
+            names = players['Player'].cat.categories
+        else:
+            codes, names = pd.factorize(players['Player'])
+        size = len(names)
+        gold = players['Gold'].to_numpy(float)
+        damage = players['Damage'].to_numpy(float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = damage / gold
+            valid = ~np.isnan(ratio)
+            ratios = np.bincount(codes, valid, size)
+            mean = np.bincount(codes, np.where(valid, ratio, 0), size) / (
+                   np.maximum(ratios, 1))
+            deviation = np.where(valid, ratio - mean[codes], 0)
+        partial = pd.DataFrame({
+            'Number_of_Games': np.bincount(codes, minlength=size) * 1.0,
+            'Gold': np.bincount(codes, gold, size),
+            'Damage': np.bincount(codes, damage, size),
+            'Ratios': ratios,
+            'Mean': mean,
+            'M2': np.bincount(codes, deviation ** 2, size)},
+            index=pd.Index(names, name='Player'))
+        self.merge_table(partial[partial['Number_of_Games'] > 0])
+
+    def merge(self, other):
+        """
+        Takes another PlayerStats and merges its statistics into this one.
+        """
+        self.merge_table(other.table)
+
+    def merge_table(self, table):
+        """
+        Takes a table of partial statistics indexed by player and merges it
+        into the statistics of this accumulator.
+        """
+        if self.table.empty:
+            self.table = table[COLUMNS].copy()
+            return
+        index = self.table.index.union(table.index)
+        a = self.table.reindex(index, fill_value=0.0)
+        b = table.reindex(index, fill_value=0.0)
+        merged = a[['Number_of_Games', 'Gold', 'Damage', 'Ratios']] + (
+                 b[['Number_of_Games', 'Gold', 'Damage', 'Ratios']])
+        count = merged['Ratios'].clip(lower=1)
+        delta = b['Mean'] - a['Mean']
+        merged['Mean'] = a['Mean'] + delta * b['Ratios'] / count
+        merged['M2'] = a['M2'] + b['M2'] + delta ** 2 * (
+                       a['Ratios'] * b['Ratios'] / count)
+        self.table = merged
+
+    def result(self):
+        """
+        Returns a dataframe indexed by player, sorted by name, with the
+        columns Gold, Damage, Number_of_Games and Variance (the sample
+        variance of the damage per gold ratio, missing for players with
+        fewer than two defined ratios).
+        """
+        table = self.table.sort_index()
+        ratios = table['Ratios']
+        result = table[['Gold', 'Damage']].copy()
+        result['Number_of_Games'] = table['Number_of_Games'].astype(int)
+        result['Variance'] = (table['M2'] / (ratios - 1)).where(ratios > 1)
+        return result
+
+
+def rolling_moments(values, groups, window):
+    """
+    This function takes an array of values, an array of the group of every
+    value (the values of a group next to each other, in order) and the
+    number of values in a window as parameters. It returns the mean and
+    the sample variance of every value and the at most window - 1 values
+    of its group before it (the variance missing for the first value of a
+    group), and the number of values left after every value in its group.
+    Every offset in the window is one vectorized step, so the cost does
+    not grow with the number of groups.
+    """
+    size = len(values)
+    rows = np.arange(size)
+    first = np.ones(size, dtype=bool)
+    first[1:] = groups[1:] != groups[:-1]
+    last = np.ones(size, dtype=bool)
+    last[:-1] = first[1:]
+    position = rows - np.maximum.accumulate(np.where(first, rows, 0))
+    left = np.minimum.accumulate(np.where(last, rows, size)[::-1])[::-1] - (
+           rows)
+    count = np.minimum(position, window - 1) + 1
+    total = np.zeros(size)
+    for offset in range(window):
+        inside = position >= offset
+        total[inside] += values[rows[inside] - offset]
+    mean = total / count
+    squares = np.zeros(size)
+    for offset in range(window):
+        inside = position >= offset
+        squares[inside] += (values[rows[inside] - offset] -
+                            mean[inside]) ** 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        variance = np.where(count > 1, squares / (count - 1), np.nan)
+    return mean, variance, left
+
+
+class RollingStats:
+    """
+    Accumulates the rolling mean and variance of the damage per gold ratio
+    of every player over their last games, in match order. Between chunks
+    only the last window - 1 games of every player are kept, so adding the
+    games of new matches only computes the windows ending in those games,
+    from the kept games of the players in them, instead of every window
+    again.
+    """
+
+    def __init__(self, window=WINDOW):
+        """
+        Takes the number of games in a window as parameter.
+        """
+        self.window = window
+        self.tails = pd.DataFrame({'Player': pd.Series(dtype='str'),
+                                   'Match': pd.Series(dtype='int64'),
+                                   'Dmg_Per_Gold': pd.Series(dtype=float)})
+        self.windows = []
+
+    def add(self, players):
+        """
+        Takes a dataframe with columns named Player, Match, Gold and Damage
+        (one row per player per game) whose matches all come after the
+        matches added before, adds its games and returns the windows ending
+        in them, in the same columns as result. Games with a missing ratio
+        are left out.
+        """
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = players['Damage'].to_numpy(float) / (
+                players['Gold'].to_numpy(float))
+        games = pd.DataFrame({'Player': players['Player'].astype('str'),
+                              'Match': players['Match'].to_numpy('int64'),
+                              'Dmg_Per_Gold': ratio})
+        games = games[games['Dmg_Per_Gold'].notna()]
+        involved = self.tails['Player'].isin(games['Player'].unique())
+        tails = self.tails[involved]
+        games = pd.concat([tails, games], ignore_index=True)
+        codes, _ = pd.factorize(games['Player'])
+        order = np.lexsort((games['Match'].to_numpy(), codes))
+        games = games.iloc[order]
+        mean, variance, left = rolling_moments(
+            games['Dmg_Per_Gold'].to_numpy(float), codes[order], self.window)
+        games = games.assign(Rolling_Mean=mean, Rolling_Variance=variance)
+        new = games[games.index >= len(tails.index)].reset_index(drop=True)
+        self.tails = pd.concat([self.tails[~involved], games.loc[
+            left < self.window - 1, ROLLING_COLUMNS]], ignore_index=True)
+        self.windows.append(new)
+        return new
+
+    def result(self):
+        """
+        Returns a dataframe with one row per game of every player, sorted
+        by player and then match, with the columns Player, Match,
+        Dmg_Per_Gold, Rolling_Mean and Rolling_Variance (the mean and the
+        sample variance of the ratio over the player's last window games up
+        to that one, the variance missing for the first game).
+        """
+        if not self.windows:
+            return pd.DataFrame(columns=ROLLING_COLUMNS + [
+                'Rolling_Mean', 'Rolling_Variance'])
+        result = pd.concat(self.windows, ignore_index=True)
+        result = result.sort_values(by=['Player', 'Match'], kind='stable')
+        return result.reset_index(drop=True)
+
+
+def load_rolling(state_file, filepath, window=WINDOW, players=None):
+    """
+    This function takes the path of a state file written by save_rolling
+    (or None), the path of a table, the number of games in a window and a
+    list of players (all of them when None) as parameters and returns the
+    stored RollingStats and the number of rows of the table it covers.
+    Returns a new RollingStats and 0 rows instead when there is no state
+    file, when it was saved for another window or other players, or when
+    the part of the table it covers has changed since. Rows appended to
+    the table after it are fine.
+    """
+    if state_file is None or not os.path.exists(state_file):
+        return RollingStats(window), 0
+    with open(state_file, 'rb') as file:
+        state = pickle.load(file)
+    if state['window'] == window and state['players'] == (
+       None if players is None else sorted(players)) and (
+       os.path.getsize(filepath) >= state['size']) and (
+       memo.file_hash(filepath, state['size']) == state['hash']):
+        return state['stats'], state['rows']
+    return RollingStats(window), 0
+
+
+def save_rolling(state_file, filepath, stats, rows, players=None):
+    """
+    This function takes the path of a state file, the path of a table, a
+    RollingStats, the number of rows of the table added to it and the list
+    of players it was limited to (all of them when None) as parameters and
+    writes them to the state file, with the size and hash of the table so
+    load_rolling can tell whether those rows changed since.
+    """
+    stats.windows = [stats.result()]
+    state = {'window': stats.window,
+             'players': None if players is None else sorted(players),
+             'size': os.path.getsize(filepath),
+             'hash': memo.file_hash(filepath),
+             'rows': rows, 'stats': stats}
+    with open(state_file + '.part', 'wb') as file:
+        pickle.dump(state, file)
+    os.replace(state_file + '.part', state_file)
+
+
+class AllStarStats:
+    """
+    Accumulates what the third research question needs from the KDA and
+    region files. Rows of the KDA file are summed per player and position
+    and remember the number of the first row they came from, so the
+    All-Star teams break ties the same way as when the whole file is read
+    at once. Rows with a missing value are left out.
+    """
+
+    def __init__(self):
+        self.kda = pd.DataFrame(columns=KDA_COLUMNS, dtype=float)
+        self.regions = pd.Series(dtype=float, name='Count')
+
+    def add_kda(self, df):
+        """
+        Takes a typed dataframe of the KDA table (see tables.py), with
+        columns named Player, Position, Games, Win rate (a fraction) and
+        KDA, and adds its rows to the statistics.
+        """
+        df = df.dropna()
+        partial = pd.DataFrame({
+            'Games': df['Games'].astype(float),
+            'Win rate': df['Win rate'].astype(float),
+            'KDA': df['KDA'].astype(float),
+            'Rows': 1.0,
+            'First': df.index.to_numpy(float)})
+        partial = partial.groupby([df['Player'], df['Position']],
+                                  observed=True).agg({
+            'Games': 'sum', 'Win rate': 'sum', 'KDA': 'sum', 'Rows': 'sum',
+            'First': 'min'})
+        self.merge_kda(partial)
+
+    def add_regions(self, df):
+        """
+        Takes a typed dataframe of the region table, with columns named
+        Player and Region, and counts the region of every row.
+        """
+        df = df.dropna()
+        self.merge_regions(df.groupby(['Player', 'Region'],
+                                      observed=True).size())
+
+    def merge(self, other):
+        """
+        Takes another AllStarStats and merges its statistics into this one.
+        """
+        self.merge_kda(other.kda)
+        self.merge_regions(other.regions)
+
+    def merge_kda(self, table):
+        """
+        Takes a table of partial KDA sums indexed by player and position and
+        merges it into the statistics of this accumulator.
+        """
+        if self.kda.empty:
+            self.kda = table[KDA_COLUMNS].astype(float)
+            return
+        merged = pd.concat([self.kda, table[KDA_COLUMNS]])
+        self.kda = merged.groupby(level=[0, 1]).agg({
+            'Games': 'sum', 'Win rate': 'sum', 'KDA': 'sum', 'Rows': 'sum',
+            'First': 'min'})
+
+    def merge_regions(self, counts):
+        """
+        Takes a series of partial counts indexed by player and region and
+        merges it into the statistics of this accumulator.
+        """
+        if self.regions.empty:
+            self.regions = counts.astype(float).rename('Count')
+            return
+        merged = pd.concat([self.regions, counts.astype(float)])
+        self.regions = merged.groupby(level=[0, 1]).sum().rename('Count')
+
+    def result(self):
+        """
+        Returns a dataframe indexed by player with one row per position and
+        region of every player, ordered by the first row of the KDA file
+        the position came from, with the columns Position, Games (the games
+        of the player in all positions, counted once for every time the
+        player shows up in that region), Win rate and KDA (the means over
+        all rows of the player) and Region.
+        """
+        kda = self.kda.reset_index()
+        kda.columns = ['Player', 'Position'] + KDA_COLUMNS
+        totals = kda.groupby('Player')[['Games', 'Win rate', 'KDA',
+                                        'Rows']].sum()
+        totals['Win rate'] = totals['Win rate'] / totals['Rows']
+        totals['KDA'] = totals['KDA'] / totals['Rows']
+        regions = self.regions.reset_index()
+        regions.columns = ['Player', 'Region', 'Count']
+        result = kda[['Player', 'Position', 'First']].merge(
+            totals[['Games', 'Win rate', 'KDA']], left_on='Player',
+            right_index=True).merge(regions, on='Player')
+        result['Games'] = (result['Games'] * result['Count']).astype(int)
+        result = result.sort_values(by=['First', 'Region'], kind='stable')
+        return result.set_index('Player')[['Position', 'Games', 'Win rate',
+                                           'KDA', 'Region']]
@@ -8,233 +8,453 @@ questions.
 
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
+from pandas.api.types import union_categoricals
+from accumulate import WINDOW, AllStarStats, PlayerStats
+from accumulate import load_rolling, save_rolling
+import bootstrap
+import instrument
+import memo
+import render
+import store
+import tables
+
+OBJECTIVES = ['Dragon', 'Elder_Dragon', 'Herald', 'Baron']
+POSITIONS = ['Top', 'Jun', 'Mid', 'ADC', 'Sup']
+SIDES = ['B', 'R']
+PERFORMANCE = ['Bang', 'PraY', 'Uzi']
+REGIONS = {'CN': ('China', 'red'), 'TW': ('Taiwan', 'purple'),
+           'NA': ('North America', 'blue'), 'EUW': ('Europe West', 'green'),
+           'KR': ('Korea', 'black'), 'VN': ('Vietnam', 'yellow')}
+
+
+def draw(charts, specs):
+    """
+    This function takes a list to collect chart specs in (or None) and a
+    list of chart specs as parameters. It adds the specs to the list, to be
+    rendered later in one batch, or renders them right away when there is
+    no list.
+    """
+    if charts is None:
+        render.render_charts(specs)
+    else:
+        charts.extend(specs)
 
 
-def objective_score(filepath):
+def objective_score(filepath, objectives=OBJECTIVES, chunksize=None,
+                    charts=None):
     """
     This function gives solutions to the first research question.
-    It takes a filepath as parameter and calculates and plots the
-    objective scores of each of the four neutral objectives in
-    League of Legends.
+    It takes a filepath, a list of objectives, a number of rows and a list
+    to collect chart specs in as parameters and calculates and plots the
+    objective scores of each of the given neutral objectives in League of
+    Legends (by default all four of them). When chunksize is given the file
+    is read that many matches at a time instead of all at once. When charts
+    is given the charts are added to it instead of being rendered.
     """
-    # Load in file
-    df = pd.read_csv(filepath)
-    num_matches = len(df.index)
-    df_b = df[df['Win_B'] == 1]
-    df_r = df[df['Win_R'] == 1]
-
-    # Calculate objective scores
-    dragon_score = get_score(df_b, df_r, 'Dragon') / num_matches
-    elder_score = get_score(df_b, df_r, 'Elder_Dragon') / num_matches
-    herald_score = get_score(df_b, df_r, 'Herald') / num_matches
-    baron_score = get_score(df_b, df_r, 'Baron') / num_matches
+    # Load in file and calculate objective scores
+    totals = np.zeros(len(objectives))
+    num_matches = 0
+    for df in instrument.iterate('objective_score.load', tables.read_table,
+                                 filepath, 'objectives', chunksize):
+        with instrument.span('objective_score.score'):
+            totals += objective_totals(df, objectives)
+        num_matches += len(df.index)
+    scores = (totals / num_matches).tolist()
 
     # Plotting the objective scores
-    objs = ('Dragon', 'Elder Dragon', 'Herald', 'Baron')
-    scores = [dragon_score, elder_score, herald_score, baron_score]
-    position = np.arange(len(scores))
-    figure, ax = plt.subplots()
-    ax.bar(position, scores)
-    ax.set_xticks(position)
-    ax.set_xticklabels(objs)
-    ax.set_ylabel('Objective Score')
-    ax.set_title('Objective Score of All Four Neutral Objectives in LOL')
-    plt.savefig('objective_score.jpg')
+    objs = [obj.replace('_', ' ') for obj in objectives]
+    if objectives == OBJECTIVES:
+        title = 'Objective Score of All Four Neutral Objectives in LOL'
+    else:
+        title = 'Objective Score of Neutral Objectives in LOL'
+    draw(charts, [render.chart('objective_score.jpg', 'bar', scores, objs,
+                               title, ylabel='Objective Score')])
+    return scores
 
 
-def get_score(df_b, df_r, obj):
+def objective_totals(df, objectives):
     """
     This is a helper function for objective_score.
-    This function takes two dataframe and name of the objective as parameters
-    and calculate the total obkective score of that objective over all the
-    games in the database.
+    This function takes a dataframe and a list of objectives as parameters
+    and sums, for every objective, the winner's objectives minus the
+    loser's over all the games in one pass, using a sign of 1 when blue
+    wins and -1 when red wins. Dividing by the number of games gives the
+    objective scores.
+    """
+    blue, red, sign = objective_sides(df, objectives)
+    return sign @ (blue - red)
+
+
+def objective_margins(df, objectives):
+    """
+    This is a helper function for objective_intervals.
+    This function takes a dataframe and a list of objectives as parameters
+    and returns a (games x objectives) array with the winner's objectives
+    minus the loser's in every game, whose column means are the objective
+    scores.
     """
-    score_b = df_b[obj + '_B'].sum() - df_b[obj + '_R'].sum()
-    score_r = df_r[obj + '_R'].sum() - df_r[obj + '_B'].sum()
-    score = score_b + score_r
-    return score
+    blue, red, sign = objective_sides(df, objectives)
+    return sign[:, np.newaxis] * (blue - red)
 
 
-def consistent_player(filepath):
+def objective_sides(df, objectives):
+    """
+    This is a helper function for objective_totals and objective_margins.
+    This function takes a dataframe and a list of objectives as parameters
+    and returns the arrays of blue side's and red side's objectives in
+    every game (missing ones counted as 0) and the array of signs, 1 when
+    blue wins and -1 when red wins.
+    """
+    blue = df[[obj + '_B' for obj in objectives]].fillna(0).to_numpy(float)
+    red = df[[obj + '_R' for obj in objectives]].fillna(0).to_numpy(float)
+    sign = (df['Win_B'] == 1).to_numpy(float) - (
+            df['Win_R'] == 1).to_numpy(float)
+    return blue, red, sign
+
+
+def objective_intervals(filepath, objectives=OBJECTIVES,
+                        resamples=bootstrap.RESAMPLES,
+                        confidence=bootstrap.CONFIDENCE, seed=0,
+                        chunksize=None, processes=None):
+    """
+    This function takes a filepath, a list of objectives, the number of
+    bootstrap resamples, the confidence level, a seed, a number of rows
+    and the number of worker processes as parameters and returns a
+    dataframe indexed by objective with the objective score and the lower
+    and upper bounds of its bootstrap confidence interval (see
+    bootstrap.py). The same seed always gives the same intervals.
+    """
+    margins = [objective_margins(df, objectives) for df in instrument.iterate(
+               'objective_intervals.load', tables.read_table, filepath,
+               'objectives', chunksize)]
+    margins = np.concatenate(margins)
+    with instrument.span('objective_intervals.bootstrap'):
+        lower, upper = bootstrap.intervals(margins, resamples, confidence,
+                                           seed, processes)
+    return pd.DataFrame({'Objective Score': margins.mean(axis=0),
+                         'Lower': lower, 'Upper': upper},
+                        index=pd.Index(objectives, name='Objective'))
+
+
+def consistent_player(filepath, chunksize=None, charts=None):
     """
     This function gives solutions to the second research question.
-    It takes a filepath as parameter and calculates and plots the
-    damage per gold ratio for the top 10 most consistent players.
-    It also plots the performance over time plot for the three most
-    consistent players.
-    """
-    # Reading in the data
-    df = pd.read_csv(filepath)
-    top_laners = group_by_position(df, 'Top')
-    junglers = group_by_position(df, 'Jun')
-    mid_laners = group_by_position(df, 'Mid')
-    adcs = group_by_position(df, 'ADC')
-    supports = group_by_position(df, 'Sup')
-    players = top_laners.append([junglers, mid_laners, adcs, supports])
-
-    # Calculating variance for each player
-    df2 = players.copy()
-    df2['Dmg_Per_Gold'] = df2['Damage'] / df2['Gold']
-    variance = df2.groupby('Player')['Dmg_Per_Gold'].var()
-    df_var = pd.DataFrame({'Player': variance.index,
-                          'Variance': variance.values})
-    df_var = df_var.set_index('Player')
+    It takes a filepath, a number of rows and a list to collect chart specs
+    in as parameters and calculates and plots the damage per gold ratio for
+    the top 10 most consistent players. It also plots the performance over
+    time plot for the three most consistent players. When chunksize is
+    given the file is read that many matches at a time, keeping only the
+    games of those three players. When charts is given the charts are added
+    to it instead of being rendered. Returns the top 10 players of both
+    groups in one dataframe indexed by group ('Overall' or 'Veteran') and
+    player.
+    """
+    # Reading in the data and calculating games, gold, damage and
+    # variance for each player
+    stats = PlayerStats()
+    games = []
+    for df in instrument.iterate('consistent_player.load',
+                                 tables.read_table, filepath, 'players',
+                                 chunksize):
+        with instrument.span('consistent_player.reshape'):
+            players = stack_players(df)
+        with instrument.span('consistent_player.groupby'):
+            stats.add(players)
+        games.append(players[players['Player'].isin(PERFORMANCE)])
+    with instrument.span('consistent_player.groupby'):
+        df3 = stats.result()
+    df2 = pd.concat(games).sort_values(by=['Position', 'Side'],
+                                       kind='stable')
+    df2['Dmg_Per_Gold'] = df2['Damage'].astype('float64') / df2['Gold']
 
     # Plotting out all the variances to determine a good threshold
-    position = np.arange(len(df_var.index))
-    figure, ax = plt.subplots()
-    ax.bar(position, df_var['Variance'])
-    ax.set_ylabel('Damage Per Gold Variance')
-    ax.set_title('Damage Per Gold Variance Plot for All Players')
-    plt.savefig('All_player_variances.jpg')
+    specs = [render.chart('All_player_variances.jpg', 'bar',
+                          df3['Variance'],
+                          title='Damage Per Gold Variance Plot for All '
+                                'Players',
+                          ylabel='Damage Per Gold Variance')]
 
     # Removing players with less than 30 games and with high variacne
-    df3 = players.copy()
-    df3['Number_of_Games'] = 1
-    df3 = df3.groupby('Player')[['Gold', 'Damage', 'Number_of_Games']].sum()
-    df3['Variance'] = df_var['Variance']
     filter1 = (df3['Number_of_Games'] >= 30) & (df3['Variance'] <= 0.2)
     filter2 = df3['Number_of_Games'] >= 60
 
     # Calculating overall most consistent player
     df4 = df3.copy()
     df4 = df4[filter1]
-    df4['Dmg_Per_Gold'] = df4['Damage'] / df4['Gold']
+    df4['Dmg_Per_Gold'] = df4['Damage'].astype('float64') / df4['Gold']
     df4 = df4.sort_values(by=['Dmg_Per_Gold'], ascending=False).head(10)
 
     # Calculating most consistent veteran player (60+ games)
     df5 = df3.copy()
     df5 = df5[filter2]
-    df5['Dmg_Per_Gold'] = df5['Damage'] / df5['Gold']
+    df5['Dmg_Per_Gold'] = df5['Damage'].astype('float64') / df5['Gold']
     df5 = df5.sort_values(by=['Dmg_Per_Gold'], ascending=False).head(10)
 
     # Plotting everything
-    plot_player_data(df4, 'Overall', 'Dmg_Per_Gold', 'blue')
-    plot_player_data(df4, 'Overall', 'Number_of_Games', 'green')
-    plot_player_data(df4, 'Overall', 'Variance', 'red')
-    plot_player_data(df5, 'Veteran', 'Dmg_Per_Gold', 'blue')
-    plot_player_data(df5, 'Veteran', 'Number_of_Games', 'green')
-    plot_player_data(df5, 'Veteran', 'Variance', 'red')
-    plot_player_performance(df2, 'Bang')
-    plot_player_performance(df2, 'PraY')
-    plot_player_performance(df2, 'Uzi')
+    specs.append(plot_player_data(df4, 'Overall', 'Dmg_Per_Gold', 'blue'))
+    specs.append(plot_player_data(df4, 'Overall', 'Number_of_Games',
+                                  'green'))
+    specs.append(plot_player_data(df4, 'Overall', 'Variance', 'red'))
+    specs.append(plot_player_data(df5, 'Veteran', 'Dmg_Per_Gold', 'blue'))
+    specs.append(plot_player_data(df5, 'Veteran', 'Number_of_Games',
+                                  'green'))
+    specs.append(plot_player_data(df5, 'Veteran', 'Variance', 'red'))
+    for player, ratios in player_performance(df2, PERFORMANCE).items():
+        specs.append(plot_player_performance(ratios, player))
+    draw(charts, specs)
+    return pd.concat({'Overall': df4, 'Veteran': df5}, names=['Group'])
+
+
+def performance_report(filepath, players=None, chunksize=None, charts=None):
+    """
+    This function takes a filepath, a list of players (all of them when
+    None), a number of rows and a list to collect chart specs in as
+    parameters. It returns a dictionary from every chosen player to the
+    damage per gold of each game that player has played, in the same order
+    as consistent_player, and plots it for each of them. When chunksize is
+    given the file is read that many matches at a time. The filepath can
+    also be a SQLite store (see store.py), whose games are looked up
+    player by player. When charts is given the charts are added to it
+    instead of being rendered.
+    """
+    if filepath.endswith(store.SUFFIX):
+        report = store_performance(filepath, players)
+        draw(charts, [plot_player_performance(ratios, player)
+                      for player, ratios in report.items()])
+        return report
+    games = []
+    for df in instrument.iterate('performance_report.load',
+                                 tables.read_table, filepath, 'players',
+                                 chunksize):
+        with instrument.span('performance_report.reshape'):
+            players_df = stack_players(df)
+        if players is not None:
+            players_df = players_df[players_df['Player'].isin(players)]
+        games.append(players_df)
+    df2 = pd.concat(games).sort_values(by=['Position', 'Side'],
+                                       kind='stable')
+    df2['Dmg_Per_Gold'] = df2['Damage'].astype('float64') / df2['Gold']
+    with instrument.span('performance_report.groupby'):
+        report = player_performance(df2, players)
+    draw(charts, [plot_player_performance(ratios, player)
+                  for player, ratios in report.items()])
+    return report
+
+
+def store_performance(path, players=None):
+    """
+    This is a helper function for performance_report.
+    It takes the path of a SQLite store and a list of players (all of them
+    when None) as parameters and returns a dictionary from every chosen
+    player, sorted by name, to a series of that player's damage per gold in
+    game order, looking up the games of each player through its index.
+    """
+    conn = store.open_store(path)
+    if players is None:
+        players = store.player_names(conn)
+    report = {}
+    for player in sorted(players):
+        games = store.player_games(conn, player)
+        if len(games.index) > 0:
+            report[player] = games['Damage'] / games['Gold']
+    conn.close()
+    return report
+
+
+def player_performance(df, players=None):
+    """
+    This is a helper function for consistent_player and performance_report.
+    It takes a dataframe of stacked games with a Dmg_Per_Gold column and a
+    list of players (all of them when None) as parameters and returns a
+    dictionary from every chosen player, sorted by name, to a series of
+    that player's damage per gold in game order. The rows of every player
+    are found by grouping the games once instead of scanning them once per
+    player.
+    """
+    rows = df.groupby('Player', observed=True).indices
+    if players is not None:
+        rows = {player: rows[player] for player in players if player in rows}
+    ratios = df['Dmg_Per_Gold']
+    return {player: ratios.iloc[rows[player]] for player in sorted(rows)}
 
 
-def group_by_position(df, position):
+def stack_players(df):
     """
     This is a helper function for consistent_player.
-    This function takes a dataframe and a LOL position as parameters
-    and group all the players within that position. It returns a new
-    dataframe with columns named Player, Gold and Damage.
-    """
-    df1 = df[[position + '_B', position + '_B_Gold', position + '_B_Damage']]
-    df1 = df1.rename(columns={position + '_B': 'Player',
-                     position + '_B_Gold': 'Gold',
-                     position + '_B_Damage': 'Damage'})
-    df2 = df[[position + '_R', position + '_R_Gold', position + '_R_Damage']]
-    df2 = df2.rename(columns={position + '_R': 'Player',
-                     position + '_R_Gold': 'Gold',
-                     position + '_R_Damage': 'Damage'})
-    df = df1.append(df2).dropna()
-    return df
+    This function takes a dataframe with one row per match as parameter
+    and stacks the player, gold and damage columns of all 10 players into
+    one long dataframe with columns named Player, Match (the row of the
+    match in its table), Gold, Damage, Position and Side, ordered by
+    position, then side, then match. Player, Position and Side are
+    categorical columns and Gold and Damage are float32. The player
+    columns are stacked by merging their categories, without hashing
+    every name again. Rows with missing values are dropped.
+    """
+    slots = [position + '_' + side for position in POSITIONS
+             for side in SIDES]
+    num_matches = len(df.index)
+    position = np.repeat(np.arange(len(POSITIONS)), len(SIDES) * num_matches)
+    side = np.tile(np.repeat(np.arange(len(SIDES)), num_matches),
+                   len(POSITIONS))
+    names = [df[slot].astype('category') for slot in slots]
+    names = [name.cat.set_categories(name.cat.categories.astype('str'))
+             for name in names]
+    players = pd.DataFrame({
+        'Player': union_categoricals(names),
+        'Match': np.tile(df.index.to_numpy(), len(slots)),
+        'Gold': df[[slot + '_Gold' for slot in slots]].to_numpy(
+            'float32').ravel(order='F'),
+        'Damage': df[[slot + '_Damage' for slot in slots]].to_numpy(
+            'float32').ravel(order='F'),
+        'Position': pd.Categorical.from_codes(position, POSITIONS),
+        'Side': pd.Categorical.from_codes(side, SIDES)})
+    return players.dropna().reset_index(drop=True)
 
 
 def plot_player_data(df, type, datatype, color):
     """
     This is a helper function for consistent_player.
     This fucntion takes a dataframe, an analysis type, a data name
-    and a color as parameter, and plot the corresponding data on a
-    bar chart with the passed color. It saves the graph and names it
-    according to the type of the analysis and name of data plotted.
-    """
-    position = np.arange(len(df.index))
-    fig, ax = plt.subplots()
-    ax.bar(position, df[datatype], align='center', color=color)
-    ax.set_xticks(position)
-    ax.set_xticklabels(df.index)
-    plt.xticks(rotation=45)
+    and a color as parameter, and returns the chart spec of the
+    corresponding data on a bar chart with the passed color. The graph
+    is named according to the type of the analysis and name of data
+    plotted.
+    """
+    values = df[datatype]
     if datatype == 'Dmg_Per_Gold':
         datatype = 'Damage Per Gold'
     elif datatype == 'Number_of_Games':
         datatype = 'Number of Games'
-    ax.set_ylabel(datatype)
-    ax.set_title(type + ' Top 10 Most Consistent Players - ' + datatype)
-    plt.savefig(type + '_' + datatype + '.jpg')
+    return render.chart(type + '_' + datatype + '.jpg', 'bar', values,
+                        df.index, type + ' Top 10 Most Consistent Players - ' +
+                        datatype, ylabel=datatype, color=color, rotation=45)
 
 
-def plot_player_performance(df, player):
+def plot_player_performance(ratios, player):
     """
-    This is a helper function for consistent_player.
-    This function takes a dataframe and the name of a player as parameters
-    and plots the change of that player's damage per gold over all the
-    games that that player have played.
+    This is a helper function for consistent_player and performance_report.
+    This function takes the damage per gold of every game of a player and
+    the name of that player as parameters and returns the chart spec of
+    the change of that player's damage per gold over all the games that
+    that player have played.
+    """
+    return render.chart(player + '_Performance.jpg', 'line', ratios,
+                        title=player + "'s Performance Over Time",
+                        xlabel='Number of Games', ylabel='Damage Per Gold')
+
+
+def rolling_form(filepath, players=None, window=WINDOW, chunksize=None,
+                 charts=None, state_file=None):
     """
-    games = df.copy()
-    games = games[games['Player'] == player]
-    position = np.arange(len(games.index))
-    fig, ax = plt.subplots()
-    ax.plot(position, games['Dmg_Per_Gold'])
-    ax.set_ylabel('Damage Per Gold')
-    ax.set_xlabel('Number of Games')
-    ax.set_title(player + "'s Performance Over Time")
-    plt.savefig(player + '_Performance.jpg')
+    This function takes a filepath, a list of players (all of them when
+    None), the number of games in a window, a number of rows, a list to
+    collect chart specs in and the path of a state file as parameters. It
+    returns a dataframe with the damage per gold of every game of the
+    chosen players in match order and its rolling mean and variance over
+    the player's last window games (see RollingStats), and plots the
+    rolling mean of every chosen player (of none when players is None).
+    When chunksize is given the file is read that many matches at a time
+    and every chunk only adds the windows ending in its games. When charts
+    is given the charts are added to it instead of being rendered. When
+    state_file is given the windows are saved in it, and a later run only
+    adds the matches appended to the file since (see load_rolling).
+    """
+    stats, covered = load_rolling(state_file, filepath, window, players)
+    rows = covered
+    for df in instrument.iterate('rolling_form.load', tables.read_table,
+                                 filepath, 'players', chunksize):
+        df = df[df.index >= covered]
+        if df.empty:
+            continue
+        with instrument.span('rolling_form.reshape'):
+            games = stack_players(df)
+            if players is not None:
+                games = games[games['Player'].isin(players)]
+        with instrument.span('rolling_form.rolling'):
+            stats.add(games)
+        rows += len(df.index)
+    if state_file is not None:
+        save_rolling(state_file, filepath, stats, rows, players)
+    form = stats.result()
+    specs = []
+    if players is not None:
+        for player, games in form.groupby('Player', sort=True):
+            specs.append(plot_player_form(games['Rolling_Mean'], player,
+                                          window))
+    draw(charts, specs)
+    return form
+
+
+def plot_player_form(means, player, window):
+    """
+    This is a helper function for rolling_form.
+    This function takes the rolling mean of the damage per gold of every
+    game of a player, the name of that player and the number of games in a
+    window as parameters and returns the chart spec of that player's form
+    over all the games that player has played.
+    """
+    return render.chart(player + '_Form.jpg', 'line', means,
+                        title=player + "'s Damage Per Gold Over the Last "
+                                       '%d Games' % window,
+                        xlabel='Number of Games', ylabel='Damage Per Gold')
 
 
-def all_star(kda_file, region_file):
+def all_star(kda_file, region_file, chunksize=None, charts=None):
     """
     This function gives solutions to the third research question.
     It takes two filepath (one containing player information, one containing
-    region information) as parameters and calculates the best player in each
-    position according to PT-score and plots the PT-score of players. It also
-    plots the cumulative scores for the All-Star teams from each region.
+    region information), a number of rows and a list to collect chart specs
+    in as parameters and calculates the best player in each position
+    according to PT-score and plots the PT-score of players. It also plots
+    the cumulative scores for the All-Star teams from each region. When
+    chunksize is given the files are read that many rows at a time. When
+    charts is given the charts are added to it instead of being rendered.
+    Returns the dataframe of the All-Star teams (see all_star_teams).
     """
     # Loading and joining files
-    df = pd.read_csv(kda_file, na_values='-').set_index('Player')
-    df2 = pd.read_csv(region_file, keep_default_na=False).set_index('Player')
-    df = df.join(df2).dropna()
-    df['KDA'] = df['KDA'].astype(float)
-    df['Win rate'] = df['Win rate'].map(lambda x: x.rstrip('%')).astype(float)
-    df['Win rate'] = df['Win rate'] / 100
-
-    # Constructing dataframes of all-star teams
-    cn = get_regional_data(df, 'CN')
-    tw = get_regional_data(df, 'TW')
-    na = get_regional_data(df, 'NA')
-    euw = get_regional_data(df, 'EUW')
-    kr = get_regional_data(df, 'KR')
-    vn = get_regional_data(df, 'VN')
+    stats = AllStarStats()
+    for df in instrument.iterate('all_star.load', tables.read_table,
+                                 kda_file, 'kda', chunksize):
+        with instrument.span('all_star.groupby'):
+            stats.add_kda(df)
+    for df in instrument.iterate('all_star.load', tables.read_table,
+                                 region_file, 'region', chunksize):
+        with instrument.span('all_star.groupby'):
+            stats.add_regions(df)
+
+    # Constructing the all-star teams of every region in the data
+    with instrument.span('all_star.groupby'):
+        df = stats.result()
+        regions = all_star_teams(df)
 
     # Plotting all the regions
-    plot_region(cn, 'China', 'red')
-    plot_region(tw, 'Taiwan', 'purple')
-    plot_region(na, 'North America', 'blue')
-    plot_region(euw, 'Europe West', 'green')
-    plot_region(kr, 'Korea', 'black')
-    plot_region(vn, 'Vietnam', 'yellow')
+    specs = []
+    for region, team in regions.groupby('Region'):
+        name, color = REGIONS.get(region, (region, 'gray'))
+        specs.append(plot_region(team, name, color))
 
     # rank all the regions
-    regions = cn.append([tw, na, euw, kr, vn])
-    rank_region(regions)
+    specs.append(rank_region(regions))
+    draw(charts, specs)
+    return regions
 
 
-def get_regional_data(df, region):
+def all_star_teams(df):
     """
     This is a helper function for all_star.
-    It takes a dataframe and the string representing a region as parameters
-    and returns a new dataframe containing the 5 best player from each region
-    determined by calculating the PT-rating of each player.
-    """
-    df2 = df.copy()
-    df2 = df2[df2['Region'] == region]
-    df2['Games'] = df2.groupby('Player')['Games'].sum()
-    df2 = df2[df2['Games'] >= 15]
-    df2['KDA'] = df2.groupby('Player')['KDA'].mean()
-    df2['Win rate'] = df2.groupby('Player')['Win rate'].mean()
-    df2 = df2.drop_duplicates()
-    df2['PT-score'] = df2['KDA'] + df2['Win rate']
-    best_team = df2.groupby('Position')['PT-score'].idxmax()
-    mask = df2.index.isin(best_team.values)
+    It takes a dataframe of the games, win rates and KDAs of every player
+    (see AllStarStats) as parameter and returns a new dataframe containing
+    the 5 best player from every region found in the data, determined by
+    calculating the PT-rating of each player. All the regions are built in
+    one grouped pass instead of one pass per region.
+    """
+    df2 = df[df['Games'] >= 15].drop_duplicates()
+    df2 = df2.assign(**{'PT-score': df2['KDA'] + df2['Win rate']})
+    best_team = df2.groupby(['Region', 'Position'], observed=True)[
+        'PT-score'].idxmax()
+    best = pd.MultiIndex.from_arrays([
+        best_team.index.get_level_values('Region'), best_team.values])
+    mask = pd.MultiIndex.from_arrays([df2['Region'], df2.index]).isin(best)
     df2 = df2[mask]
     return df2
 
@@ -243,45 +463,50 @@ def plot_region(df, region, color):
     """
     This is a helper function for all_star.
     It takes a dataframe, the string representing a region and a color as
-    parameters and plots the performance of the 5 players on that regional
-    All-Star team.
+    parameters and returns the chart spec of the performance of the 5
+    players on that regional All-Star team.
     """
-    position = np.arange(5)
-    fig, ax = plt.subplots()
-    ax.bar(position, df['PT-score'], align='center', color=color)
-    ax.set_xticks(position)
-    ax.set_xticklabels(df.index)
-    ax.set_ylabel('PT-score')
-    ax.set_title(region + ' Regional All Star Player Ratings')
-    ax.set_ylim((0, 10))
-    plt.savefig(region + '_all_star.jpg')
+    return render.chart(region + '_all_star.jpg', 'bar', df['PT-score'],
+                        df.index, region + ' Regional All Star Player Ratings',
+                        ylabel='PT-score', color=color, ylim=(0, 10))
 
 
 def rank_region(regions):
     """
     This is a helper function for all_star.
-    It takes a list of dataframes representing different regions. It
-    sorts them according to their cumulative PT-score and plots the
-    cumulative PT-score of each team.
+    It takes a dataframe of the All-Star teams of different regions. It
+    sorts them according to their cumulative PT-score and returns the
+    chart spec of the cumulative PT-score of each team.
     """
     rank = regions.groupby('Region')['PT-score'].sum()
     total = pd.DataFrame({'Region': rank.index,
                          'Cumulative Rating': rank.values})
     total = total.sort_values(by='Cumulative Rating', ascending=False)
-    position = np.arange(len(total.index))
-    fig, ax = plt.subplots()
-    ax.bar(position, total['Cumulative Rating'], align='center')
-    ax.set_xticks(position)
-    ax.set_xticklabels(total['Region'])
-    ax.set_ylabel('Cumulative Rating')
-    ax.set_title('All-Star Team Cumulative Ratings')
-    plt.savefig('best_all_star.jpg')
-
-
-def main():
-    objective_score('Matches_Objectives.csv')
-    consistent_player('Players_Gold_And_Damage.csv')
-    all_star('Players_KDA_And_Winrate.csv', 'Players_Region.csv')
+    return render.chart('best_all_star.jpg', 'bar',
+                        total['Cumulative Rating'], total['Region'],
+                        'All-Star Team Cumulative Ratings',
+                        ylabel='Cumulative Rating')
+
+
+def main(cache_dir=memo.RESULT_DIR):
+    cache = memo.open_cache(cache_dir)
+    charts = []
+    objective_file = 'Matches_Objectives.csv'
+    players_file = 'Players_Gold_And_Damage.csv'
+    kda_file = 'Players_KDA_And_Winrate.csv'
+    region_file = 'Players_Region.csv'
+    memo.cached(cache, 'objective_score', [objective_file],
+                {'objectives': OBJECTIVES},
+                lambda specs: objective_score(objective_file, charts=specs),
+                charts)
+    memo.cached(cache, 'consistent_player', [players_file],
+                {'players': PERFORMANCE},
+                lambda specs: consistent_player(players_file, charts=specs),
+                charts)
+    memo.cached(cache, 'all_star', [kda_file, region_file], {},
+                lambda specs: all_star(kda_file, region_file, charts=specs),
+                charts)
+    render.render_charts(charts)
 
 
 if __name__ == '__main__':
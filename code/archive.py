@@ -0,0 +1,105 @@
+'''
+Implements a compressed archive of raw webpages, used to split a crawl
+into a fetch stage and a parse stage. The fetch stage stores every page
+it downloads in a zip file, and the parse stage reads the pages back and
+parses them with a pool of processes, so the whole history can be parsed
+again on every core without fetching anything.
+'''
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import zipfile
+
+ARCHIVE_FILE = 'pages.zip'
+CHUNKSIZE = 16
+
+_reader = None
+
+
+class PageArchive:
+    '''
+    A zip file of webpages, each compressed with deflate and stored under
+    the sha1 hash of its url. Can be used as a context manager.
+    '''
+
+    def __init__(self, path=ARCHIVE_FILE, mode='r'):
+        '''
+        Take the path of the archive and the mode to open it with ('r' to
+        read, 'a' to add pages, 'w' to start over) as parameters.
+        '''
+        self.path = path
+        self._zip = zipfile.ZipFile(path, mode, zipfile.ZIP_DEFLATED)
+        self._names = set(self._zip.namelist())
+
+    def _name(self, url):
+        '''
+        Take a url as parameter and return the name of its archive entry.
+        '''
+        return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+    def __contains__(self, url):
+        return self._name(url) in self._names
+
+    def get(self, url):
+        '''
+        Take a url as parameter and return the content of its webpage.
+        Raises KeyError when the page is not in the archive.
+        '''
+        return self._zip.read(self._name(url))
+
+    def put(self, url, content):
+        '''
+        Take a url and the content of its webpage as parameters and add
+        them to the archive, unless the page is already there.
+        '''
+        name = self._name(url)
+        if name not in self._names:
+            info = zipfile.ZipInfo(name)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            info.comment = url.encode('utf-8')
+            self._zip.writestr(info, content)
+            self._names.add(name)
+
+    def close(self):
+        self._zip.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _open_archive(path):
+    '''
+    Open the archive with the given path once in every parse worker.
+    '''
+    global _reader
+    _reader = PageArchive(path)
+
+
+def _parse_job(job):
+    '''
+    Take a job made of a parse function, a url and extra arguments as
+    parameter and return the result of parsing that archived webpage.
+    '''
+    function, url, args = job
+    return function(_reader.get(url), *args)
+
+
+def parse_pages(path, jobs, processes=None):
+    '''
+    Take the path of an archive, a list of jobs and the number of worker
+    processes as parameters. Every job is a tuple of a module level parse
+    function, the url of an archived webpage and a tuple of extra arguments
+    for the function. Yields the result of every job in the same order as
+    the jobs, parsing the pages with a process pool (or in this process
+    when processes is 1).
+    '''
+    if processes == 1:
+        _open_archive(path)
+        for job in jobs:
+            yield _parse_job(job)
+        return
+    with ProcessPoolExecutor(processes, initializer=_open_archive,
+                             initargs=(path,)) as pool:
+        yield from pool.map(_parse_job, jobs, chunksize=CHUNKSIZE)
@@ -0,0 +1,169 @@
+'''
+Benchmarks the three analyses of algorithm.py on synthetic tables (see
+synthetic.py) of growing size and reports the wall time, the peak
+resident memory and the rows processed per second of each. Every
+analysis runs in a fresh process, so its peak memory is its own, and
+without rendering its charts. The results can be saved as a baseline,
+and later runs are compared against it, flagging every analysis that got
+slower or bigger than the tolerance allows.
+
+Usage: python bench_algorithm.py [--sizes N ...] [--chunksize N]
+                                 [--analyses NAME ...] [--baseline FILE]
+                                 [--save] [--tolerance F]
+'''
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import synthetic
+import tables
+
+ANALYSES = ['objective_score', 'consistent_player', 'all_star']
+SIZES = [10000, 100000, 1000000]
+BASELINE_FILE = 'bench_baseline.json'
+TOLERANCE = 0.25
+
+
+def run_analysis(name, directory, chunksize=None):
+    '''
+    Take the name of an analysis, the directory of the tables and a number
+    of rows as parameters, run the analysis on those tables without
+    rendering its charts and return the paths of the files it read.
+    '''
+    import algorithm
+    files = dict((table, os.path.join(directory, filename))
+                 for filename, table in tables.FILES)
+    if name == 'objective_score':
+        algorithm.objective_score(files['objectives'], chunksize=chunksize,
+                                  charts=[])
+        inputs = [files['objectives']]
+    elif name == 'consistent_player':
+        algorithm.consistent_player(files['players'], chunksize, charts=[])
+        inputs = [files['players']]
+    else:
+        algorithm.all_star(files['kda'], files['region'], chunksize,
+                           charts=[])
+        inputs = [files['kda'], files['region']]
+    return inputs
+
+
+def child(name, directory, chunksize):
+    '''
+    Take the name of an analysis, the directory of the tables and a number
+    of rows as parameters, run the analysis in this process and print its
+    wall time, peak memory in bytes and number of rows as json. The
+    modules of the analyses are imported before the clock starts.
+    '''
+    import algorithm  # noqa: F401
+    start = time.perf_counter()
+    inputs = run_analysis(name, directory, chunksize)
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    rows = 0
+    for path in inputs:
+        with open(path) as file:
+            rows += sum(1 for _ in file) - 1
+    print(json.dumps({'seconds': elapsed, 'peak_bytes': peak,
+                      'rows': rows}))
+
+
+def measure(name, directory, chunksize=None):
+    '''
+    Take the name of an analysis, the directory of the tables and a number
+    of rows as parameters and return the measurements of the analysis run
+    in a fresh process, with its throughput added.
+    '''
+    command = [sys.executable, os.path.abspath(__file__), '--child', name,
+               directory]
+    if chunksize is not None:
+        command.append(str(chunksize))
+    output = subprocess.run(command, check=True, capture_output=True,
+                            text=True).stdout
+    result = json.loads(output.strip().split('\n')[-1])
+    result['rows_per_second'] = result['rows'] / result['seconds']
+    return result
+
+
+def result_key(name, size, chunksize=None):
+    '''
+    Take the name of an analysis, the number of matches and a number of
+    rows (None when the tables are read whole) as parameters and return
+    the key of the measurements in the results and the baseline.
+    '''
+    return '%s/%d/%s' % (name, size, 'whole' if chunksize is None else (
+                         'chunks-%d' % chunksize))
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    '''
+    Take the results of a run and of the baseline, both dictionaries from
+    'analysis/size/chunksize' (see result_key) to measurements, and the
+    allowed relative increase as parameters and return a list describing
+    every regression. Only runs with the same analysis, size and chunksize
+    are compared.
+    '''
+    regressions = []
+    for key, result in sorted(results.items()):
+        if key not in baseline:
+            continue
+        for metric in ['seconds', 'peak_bytes']:
+            before = baseline[key][metric]
+            if result[metric] > before * (1 + tolerance):
+                regressions.append('%s %s: %.4g -> %.4g (+%.0f%%)' % (
+                                   key, metric, before, result[metric],
+                                   100 * (result[metric] / before - 1)))
+    return regressions
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '--child':
+        chunksize = int(sys.argv[4]) if len(sys.argv) > 4 else None
+        child(sys.argv[2], sys.argv[3], chunksize)
+        return
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--sizes', nargs='*', type=int, default=SIZES)
+    parser.add_argument('--chunksize', type=int, default=None)
+    parser.add_argument('--analyses', nargs='*', default=ANALYSES)
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    parser.add_argument('--save', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE)
+    args = parser.parse_args()
+    results = {}
+    print('%-18s %10s %10s %10s %12s' % ('analysis', 'matches', 'seconds',
+                                         'peak MB', 'rows/s'))
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            synthetic.generate(directory, size, max(500, size // 20))
+            for name in args.analyses:
+                result = measure(name, directory, args.chunksize)
+                results[result_key(name, size, args.chunksize)] = result
+                print('%-18s %10d %10.3f %10.1f %12.0f' % (
+                      name, size, result['seconds'],
+                      result['peak_bytes'] / 2 ** 20,
+                      result['rows_per_second']))
+    if args.save:
+        with open(args.baseline, 'w') as file:
+            json.dump(results, file, indent=1, sort_keys=True)
+        print('Saved the baseline to ' + args.baseline)
+        return
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        if not set(results) & set(baseline):
+            print('Nothing in ' + args.baseline + ' was run with the same '
+                  'sizes and chunksize')
+            return
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print('REGRESSION ' + regression)
+        if regressions:
+            sys.exit(1)
+        print('No regressions against ' + args.baseline)
+
+
+if __name__ == '__main__':
+    main()
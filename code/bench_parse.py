@@ -0,0 +1,84 @@
+'''
+Compares the speed of the html parsing backends of data_1_and_2.py on
+match webpages saved in the page cache. Every backend must give exactly
+the same rows as the full html.parser tree, otherwise the benchmark
+stops with an error.
+
+Usage: python bench_parse.py [cache_dir] [rounds]
+'''
+import json
+import os
+import sys
+import time
+from bs4 import FeatureNotFound
+import cache
+import data_1_and_2
+
+BACKENDS = [('html.parser', False), ('html.parser', True),
+            ('lxml', False), ('lxml', True)]
+
+
+def load_pages(cache_dir):
+    '''
+    Take the directory of the page cache as parameter and return two lists
+    with the content of the saved summary webpages and fullstats webpages
+    of single matches.
+    '''
+    summaries = []
+    stats = []
+    for name in sorted(os.listdir(cache_dir)):
+        if not name.endswith('.json'):
+            continue
+        with open(os.path.join(cache_dir, name)) as file:
+            url = json.load(file)['url']
+        with open(os.path.join(cache_dir, name[:-5] + '.page'), 'rb') as file:
+            content = file.read()
+        if url.endswith('page-fullstats/'):
+            stats.append(content)
+        elif url.endswith('page-game/'):
+            summaries.append(content)
+    return summaries, stats
+
+
+def parse_all(summaries, stats, parser, strained):
+    '''
+    Take the saved webpages, the name of the html parser and whether to
+    only parse the needed tags as parameters and return every row parsed
+    from those webpages.
+    '''
+    rows = [data_1_and_2.bo1_objective(page, parser, strained)
+            for page in summaries]
+    rows.extend(data_1_and_2.bo1_players_stats(page, parser, strained)
+                for page in stats)
+    return rows
+
+
+def main():
+    cache_dir = sys.argv[1] if len(sys.argv) > 1 else cache.CACHE_DIR
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    summaries, stats = load_pages(cache_dir)
+    num_pages = len(summaries) + len(stats)
+    if num_pages == 0:
+        print('No match webpages found in ' + cache_dir)
+        return
+    expected = parse_all(summaries, stats, 'html.parser', False)
+    print('%d summary and %d fullstats webpages' % (len(summaries),
+                                                     len(stats)))
+    for parser, strained in BACKENDS:
+        name = parser + (' + SoupStrainer' if strained else '')
+        try:
+            start = time.perf_counter()
+            for _ in range(rounds):
+                rows = parse_all(summaries, stats, parser, strained)
+            elapsed = (time.perf_counter() - start) / rounds
+        except FeatureNotFound:
+            print('%-28s not installed' % name)
+            continue
+        if rows != expected:
+            raise AssertionError(name + ' does not match html.parser')
+        print('%-28s %8.2f ms/page %8.1f pages/s' % (
+              name, 1000 * elapsed / num_pages, num_pages / elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+'''
+Benchmarks every scraper mode against the local fake gol.gg server (see
+fake_golgg.py) and reports the pages fetched per second, the p50 and p99
+latency of a page and the rows written per second. Each mode runs in its
+own temporary directory without the page cache.
+
+Usage: python bench_scrapers.py [--latency S] [--failure-rate F]
+                                [--matches N] [--workers N]
+                                [--modes MODE ...]
+'''
+import argparse
+import os
+import tempfile
+import threading
+import time
+import crawl
+import data_1_and_2
+import data_3
+import fake_golgg
+import fetch
+import throttle
+
+OUTPUT_FILES = [data_1_and_2.OBJECTIVE_FILE, data_1_and_2.PLAYERS_FILE,
+                data_3.KDA_FILE, data_3.REGION_FILE]
+
+
+def run_sequential(workers):
+    data_1_and_2.main(1, cache_dir=None, resume=False)
+    data_3.main(cache_dir=None, workers=1)
+
+
+def run_concurrent(workers):
+    data_1_and_2.main(workers, cache_dir=None, resume=False)
+    data_3.main(cache_dir=None, workers=workers)
+
+
+def run_two_stage(workers):
+    data_1_and_2.main(workers, cache_dir=None, stage='fetch')
+    data_3.main(cache_dir=None, stage='fetch', workers=workers)
+    data_1_and_2.main(cache_dir=None, stage='parse')
+    data_3.main(cache_dir=None, stage='parse')
+
+
+def run_crawl(workers):
+    crawl.main(workers, cache_dir=None, resume=False)
+
+
+MODES = [('sequential', run_sequential), ('concurrent', run_concurrent),
+         ('two-stage', run_two_stage), ('crawl', run_crawl)]
+
+
+class PageTimer:
+    '''
+    Replaces fetch.get_page while active and records the latency of every
+    page it fetches.
+    '''
+
+    def __init__(self):
+        self.latencies = []
+        self._lock = threading.Lock()
+        self._get_page = fetch.get_page
+
+    def get_page(self, url):
+        start = time.perf_counter()
+        page = self._get_page(url)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.latencies.append(elapsed)
+        return page
+
+    def __enter__(self):
+        fetch.get_page = self.get_page
+        return self
+
+    def __exit__(self, *exc_info):
+        fetch.get_page = self._get_page
+
+
+def percentile(values, fraction):
+    '''
+    Take a list of numbers and a fraction between 0 and 1 as parameters and
+    return the value below which that fraction of the numbers fall.
+    '''
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def count_rows():
+    '''
+    Return the number of rows, without headers, in the output csv files of
+    the current directory.
+    '''
+    rows = 0
+    for filename in OUTPUT_FILES:
+        if os.path.exists(filename):
+            with open(filename) as file:
+                rows += max(0, sum(1 for _ in file) - 1)
+    return rows
+
+
+def bench_mode(run, workers):
+    '''
+    Take a mode's run function and the number of worker threads as
+    parameters, run it in a temporary directory and return its wall time,
+    the latencies of its pages and the number of rows it wrote.
+    '''
+    cwd = os.getcwd()
+    throttle.reset()
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        try:
+            with PageTimer() as timer:
+                start = time.perf_counter()
+                run(workers)
+                elapsed = time.perf_counter() - start
+            rows = count_rows()
+        finally:
+            os.chdir(cwd)
+    return elapsed, timer.latencies, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--latency', type=float, default=0.02)
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--matches', type=int, default=20)
+    parser.add_argument('--workers', type=int, default=fetch.WORKERS)
+    parser.add_argument('--modes', nargs='*',
+                        default=[name for name, _ in MODES])
+    args = parser.parse_args()
+    server, url = fake_golgg.start_server(0, args.latency,
+                                          args.failure_rate, args.matches)
+    base_url = fetch.BASE_URL
+    rate = (throttle.RATE, throttle.BURST)
+    backoff = throttle.BACKOFF_BASE
+    fetch.BASE_URL = url
+    throttle.RATE = throttle.BURST = 10 ** 6
+    throttle.BACKOFF_BASE = 0.01
+    print('%-12s %8s %10s %9s %9s %10s' % ('mode', 'pages', 'pages/s',
+                                          'p50 ms', 'p99 ms', 'rows/s'))
+    try:
+        for name, run in MODES:
+            if name not in args.modes:
+                continue
+            elapsed, latencies, rows = bench_mode(run, args.workers)
+            print('%-12s %8d %10.1f %9.2f %9.2f %10.1f' % (
+                  name, len(latencies), len(latencies) / elapsed,
+                  1000 * percentile(latencies, 0.5),
+                  1000 * percentile(latencies, 0.99), rows / elapsed))
+    finally:
+        fetch.BASE_URL = base_url
+        throttle.RATE, throttle.BURST = rate
+        throttle.BACKOFF_BASE = backoff
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
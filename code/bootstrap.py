@@ -0,0 +1,113 @@
+"""
+Peter Zhong & Tony Song
+CSE 163 Final Project
+This file implements the bootstrap confidence intervals of the objective
+scores used by algorithm.py. Every block of resamples is drawn as one
+(resamples x matches) matrix of match indices, which is turned into the
+number of times every resample picks every match with one bincount, so
+the means of all resamples are a single matrix product instead of a
+Python loop per resample. The blocks are sized so their matrices stay
+under a memory bound, and are spread over a pool of processes. Every
+block has its own seed spawned from the given one, so the intervals are
+the same however many processes compute them.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+RESAMPLES = 10000
+CONFIDENCE = 0.95
+# Bytes of one resampled match: its index, its offset in the block and
+# its count as an integer and as a float
+CELL_BYTES = 4 + 8 + 8 + 8
+MAX_BLOCK_BYTES = 64 * 1024 * 1024
+
+_values = None
+
+
+def block_sizes(resamples, matches, max_bytes=MAX_BLOCK_BYTES):
+    """
+    This function takes the number of resamples, the number of matches and
+    the memory bound of one block in bytes as parameters and returns the
+    number of resamples in every block, so that a block never holds more
+    than max_bytes of indices and counts (but always at least one
+    resample).
+    """
+    size = max(1, max_bytes // (CELL_BYTES * max(matches, 1)))
+    return [min(size, resamples - start)
+            for start in range(0, resamples, size)]
+
+
+def resample_means(values, size, seed):
+    """
+    This function takes a 2D array of the values of every match (one column
+    per statistic), a number of resamples and a seed as parameters and
+    returns a (size x statistics) array with the column means of that many
+    resamples of the matches, drawn with replacement.
+    """
+    rng = np.random.default_rng(seed)
+    matches = values.shape[0]
+    indices = rng.integers(matches, size=(size, matches), dtype=np.int32)
+    offsets = indices + np.arange(0, size * matches, matches)[:, np.newaxis]
+    counts = np.bincount(offsets.ravel(), minlength=size * matches)
+    return counts.reshape(size, matches).astype(float) @ values / matches
+
+
+def _share_values(values):
+    """
+    This is a helper function for bootstrap_means.
+    It takes the values of every match as parameter and keeps them in the
+    worker process, so they are sent to every worker once and not with
+    every block.
+    """
+    global _values
+    _values = values
+
+
+def _block_means(job):
+    """
+    This is a helper function for bootstrap_means.
+    It takes a pair of a number of resamples and a seed as parameter and
+    returns the resample means of the values kept in the worker process.
+    """
+    size, seed = job
+    return resample_means(_values, size, seed)
+
+
+def bootstrap_means(values, resamples=RESAMPLES, seed=0, processes=None,
+                    max_bytes=MAX_BLOCK_BYTES):
+    """
+    This function takes a 2D array of the values of every match (one column
+    per statistic), the number of resamples, a seed, the number of worker
+    processes and the memory bound of one block in bytes as parameters and
+    returns a (resamples x statistics) array with the column means of every
+    resample. The blocks are computed with a process pool, or in this
+    process when processes is 1 or there is only one block.
+    """
+    values = np.asarray(values, dtype=float)
+    sizes = block_sizes(resamples, values.shape[0], max_bytes)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    if processes == 1 or len(sizes) <= 1:
+        blocks = [resample_means(values, size, block_seed)
+                  for size, block_seed in zip(sizes, seeds)]
+    else:
+        with ProcessPoolExecutor(processes, initializer=_share_values,
+                                 initargs=(values,)) as pool:
+            blocks = list(pool.map(_block_means, zip(sizes, seeds)))
+    return np.concatenate(blocks) if blocks else np.empty(
+        (0, values.shape[1]))
+
+
+def intervals(values, resamples=RESAMPLES, confidence=CONFIDENCE, seed=0,
+              processes=None, max_bytes=MAX_BLOCK_BYTES):
+    """
+    This function takes a 2D array of the values of every match (one column
+    per statistic), the number of resamples, the confidence level, a seed,
+    the number of worker processes and the memory bound of one block in
+    bytes as parameters and returns a (2 x statistics) array with the lower
+    and upper bounds of the percentile bootstrap confidence interval of the
+    mean of every column.
+    """
+    means = bootstrap_means(values, resamples, seed, processes, max_bytes)
+    tail = (1 - confidence) / 2
+    return np.quantile(means, [tail, 1 - tail], axis=0)
@@ -0,0 +1,146 @@
+'''
+Implements an on-disk cache of downloaded webpages for the scrapers.
+Every page is stored under the sha1 hash of its url together with the
+ETag and Last-Modified headers it was served with, so it can be
+revalidated with a conditional request later. The cache is capped in
+size and evicts the least recently used pages first.
+'''
+import hashlib
+import json
+import os
+import threading
+import time
+
+CACHE_DIR = 'page_cache'
+MAX_BYTES = 512 * 1024 * 1024
+
+
+class PageCache:
+    '''
+    A size capped, least recently used cache of webpages stored in a
+    directory. It is safe to use from several threads at once.
+    '''
+
+    def __init__(self, path=CACHE_DIR, max_bytes=MAX_BYTES):
+        '''
+        Take the directory of the cache and its maximum size in bytes as
+        parameters, creating the directory when it does not exist yet.
+        '''
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+        self._size = sum(os.path.getsize(os.path.join(path, name))
+                         for name in os.listdir(path)
+                         if name.endswith('.page'))
+        self._evict()
+
+    def _key(self, url):
+        '''
+        Take a url as parameter and return the path of its cache entry
+        without the file extension.
+        '''
+        digest = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.path, digest)
+
+    def lookup(self, url):
+        '''
+        Take a url as parameter and return a tuple of the cached content
+        and its metadata dictionary, or None when the url is not cached.
+        A hit marks the entry as recently used.
+        '''
+        key = self._key(url)
+        with self._lock:
+            try:
+                with open(key + '.json') as file:
+                    meta = json.load(file)
+                with open(key + '.page', 'rb') as file:
+                    content = file.read()
+            except (OSError, ValueError):
+                return None
+            os.utime(key + '.page')
+        return content, meta
+
+    def validators(self, meta):
+        '''
+        Take the metadata of a cache entry as parameter and return the
+        headers of a conditional request that revalidates it.
+        '''
+        headers = {}
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+        return headers
+
+    def store(self, url, content, headers):
+        '''
+        Take a url, the content of its webpage and the response headers as
+        parameters and store them in the cache, evicting old entries when
+        the cache grows over its size limit.
+        '''
+        key = self._key(url)
+        meta = {'url': url,
+                'etag': headers.get('ETag'),
+                'last_modified': headers.get('Last-Modified'),
+                'stored': time.time()}
+        with self._lock:
+            self._size -= self._entry_size(key)
+            with open(key + '.page.tmp', 'wb') as file:
+                file.write(content)
+            with open(key + '.json.tmp', 'w') as file:
+                json.dump(meta, file)
+            os.replace(key + '.page.tmp', key + '.page')
+            os.replace(key + '.json.tmp', key + '.json')
+            self._size += len(content)
+            self._evict()
+
+    def refresh(self, url):
+        '''
+        Take a url as parameter and record that its cache entry was just
+        revalidated by the server.
+        '''
+        key = self._key(url)
+        with self._lock:
+            try:
+                with open(key + '.json') as file:
+                    meta = json.load(file)
+                meta['stored'] = time.time()
+                with open(key + '.json', 'w') as file:
+                    json.dump(meta, file)
+            except (OSError, ValueError):
+                pass
+
+    def _entry_size(self, key):
+        '''
+        Take the path of a cache entry as parameter and return the size of
+        its content, or 0 when the entry does not exist.
+        '''
+        try:
+            return os.path.getsize(key + '.page')
+        except OSError:
+            return 0
+
+    def _evict(self):
+        '''
+        Remove the least recently used entries until the cache fits in its
+        size limit. The caller must hold the lock.
+        '''
+        if self._size <= self.max_bytes:
+            return
+        pages = []
+        for name in os.listdir(self.path):
+            if name.endswith('.page'):
+                full = os.path.join(self.path, name)
+                stat = os.stat(full)
+                pages.append((stat.st_mtime, stat.st_size, full[:-5]))
+        pages.sort()
+        for _, size, key in pages:
+            if self._size <= self.max_bytes:
+                break
+            for extension in ('.page', '.json'):
+                try:
+                    os.remove(key + extension)
+                except OSError:
+                    pass
+            self._size -= size
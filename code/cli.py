@@ -0,0 +1,317 @@
+'''
+Implements the command line entry point of the project, with one
+subcommand for each analysis of algorithm.py and for each scraper.
+Analyses take their input paths (the usual csv files by default), write
+their result into the output directory as text, csv or json and print
+it, and render their charts into the same directory unless --no-plots
+is given. Every heavy module (pandas, matplotlib, requests, bs4) is only
+imported by the subcommand that needs it, and matplotlib only when
+charts are drawn, so numeric queries start quickly.
+
+Usage: python cli.py [--profile FILE] SUBCOMMAND [options]
+Run python cli.py SUBCOMMAND --help for the options of a subcommand.
+'''
+import argparse
+import os
+import sys
+import memo
+
+FORMATS = {'text': 'txt', 'csv': 'csv', 'json': 'json'}
+
+
+def input_path(path, table):
+    '''
+    Take a path given on the command line (or None) and the name of a
+    table as parameters and return the path, or the usual csv file of the
+    table when no path was given.
+    '''
+    if path is not None:
+        return path
+    import tables
+    return dict((name, filename) for filename, name in tables.FILES)[table]
+
+
+def format_result(df, output_format):
+    '''
+    Take a dataframe and the name of an output format as parameters and
+    return the dataframe as text in that format.
+    '''
+    if output_format == 'csv':
+        return df.to_csv(index=False)
+    if output_format == 'json':
+        return df.to_json(orient='records', indent=1,
+                          double_precision=15) + '\n'
+    return df.to_string(index=False) + '\n'
+
+
+def write_result(df, name, args):
+    '''
+    Take the dataframe of a result, the name of its analysis and the
+    parsed arguments as parameters, write the result into the output
+    directory in the chosen format and print it.
+    '''
+    text = format_result(df, args.format)
+    path = os.path.join(args.output_dir, name + '.' + FORMATS[args.format])
+    with open(path, 'w') as file:
+        file.write(text)
+    sys.stdout.write(text)
+
+
+def run_analysis(args, name, files, params, compute):
+    '''
+    Take the parsed arguments, the name of an analysis, the paths of its
+    input files, a dictionary of its parameters and a function computing
+    it as parameters (see memo.cached), run the analysis through the
+    result cache and render its charts into the output directory unless
+    plots are turned off. Returns the result of the analysis.
+    '''
+    os.makedirs(args.output_dir, exist_ok=True)
+    cache = None if args.no_cache else memo.open_cache(args.cache_dir)
+    charts = []
+    result = memo.cached(cache, name, files, params, compute, charts)
+    if not args.no_plots and charts:
+        import render
+        render.render_charts(
+            [dict(spec, filename=os.path.join(args.output_dir,
+                                              spec['filename']))
+             for spec in charts],
+            processes=args.processes,
+            manifest=os.path.join(args.output_dir, render.MANIFEST_FILE))
+    return result
+
+
+def objective_score(args):
+    '''
+    Take the parsed arguments as parameter and run the objective score
+    analysis, with bootstrap confidence intervals when resamples are given.
+    '''
+    import algorithm
+    import pandas as pd
+    path = input_path(args.objectives_file, 'objectives')
+    objectives = args.objectives or algorithm.OBJECTIVES
+    scores = run_analysis(
+        args, 'objective_score', [path], {'objectives': objectives},
+        lambda specs: algorithm.objective_score(path, objectives,
+                                                args.chunksize, specs))
+    df = pd.DataFrame({'Objective': objectives, 'Objective Score': scores})
+    if args.bootstrap:
+        bounds = run_analysis(
+            args, 'objective_intervals', [path],
+            {'objectives': objectives, 'resamples': args.bootstrap,
+             'confidence': args.confidence, 'seed': args.seed},
+            lambda specs: algorithm.objective_intervals(
+                path, objectives, args.bootstrap, args.confidence,
+                args.seed, args.chunksize, args.processes))
+        df['Lower'] = bounds['Lower'].to_numpy()
+        df['Upper'] = bounds['Upper'].to_numpy()
+    write_result(df, 'objective_score', args)
+
+
+def consistent_player(args):
+    '''
+    Take the parsed arguments as parameter and run the consistent player
+    analysis.
+    '''
+    import algorithm
+    path = input_path(args.players_file, 'players')
+    result = run_analysis(
+        args, 'consistent_player', [path],
+        {'players': algorithm.PERFORMANCE},
+        lambda specs: algorithm.consistent_player(path, args.chunksize,
+                                                  specs))
+    write_result(result.reset_index(), 'consistent_player', args)
+
+
+def performance_report(args):
+    '''
+    Take the parsed arguments as parameter and run the performance report
+    of the chosen players.
+    '''
+    import algorithm
+    import pandas as pd
+    path = input_path(args.players_file, 'players')
+    report = run_analysis(
+        args, 'performance_report', [path], {'players': args.players},
+        lambda specs: algorithm.performance_report(path, args.players,
+                                                   args.chunksize, specs))
+    frames = [pd.DataFrame({'Player': player,
+                            'Game': range(1, len(ratios) + 1),
+                            'Dmg_Per_Gold': ratios.to_numpy()})
+              for player, ratios in report.items()]
+    df = pd.concat(frames) if frames else pd.DataFrame(
+        columns=['Player', 'Game', 'Dmg_Per_Gold'])
+    write_result(df, 'performance_report', args)
+
+
+def rolling_form(args):
+    '''
+    Take the parsed arguments as parameter and compute the rolling damage
+    per gold of the chosen players.
+    '''
+    import algorithm
+    path = input_path(args.players_file, 'players')
+    window = args.window or algorithm.WINDOW
+    form = run_analysis(
+        args, 'rolling_form', [path],
+        {'players': args.players, 'window': window},
+        lambda specs: algorithm.rolling_form(path, args.players, window,
+                                             args.chunksize, specs,
+                                             args.state))
+    write_result(form, 'rolling_form', args)
+
+
+def all_star(args):
+    '''
+    Take the parsed arguments as parameter and build the All-Star teams.
+    '''
+    import algorithm
+    kda_file = input_path(args.kda_file, 'kda')
+    region_file = input_path(args.region_file, 'region')
+    regions = run_analysis(
+        args, 'all_star', [kda_file, region_file], {},
+        lambda specs: algorithm.all_star(kda_file, region_file,
+                                         args.chunksize, specs))
+    write_result(regions.reset_index(), 'all_star', args)
+
+
+def scraper_options(args):
+    '''
+    Take the parsed arguments of a scraper as parameter and return the
+    keyword arguments of its main function that were given.
+    '''
+    options = {'cache_dir': args.cache_dir, 'offline': args.offline,
+               'workers': args.workers, 'max_age': args.max_age}
+    for name in ['resume', 'stage', 'archive_path', 'processes']:
+        if hasattr(args, name):
+            options[name] = getattr(args, name)
+    return dict((name, value) for name, value in options.items()
+                if value is not None)
+
+
+def scrape(module):
+    '''
+    Take the name of a scraper module as parameter and return the function
+    running it with the parsed arguments, inside the output directory. The
+    working directory is restored afterwards.
+    '''
+    def run(args):
+        import importlib
+        os.makedirs(args.output_dir, exist_ok=True)
+        cwd = os.getcwd()
+        os.chdir(args.output_dir)
+        try:
+            importlib.import_module(module).main(**scraper_options(args))
+        finally:
+            os.chdir(cwd)
+    return run
+
+
+def parser():
+    '''
+    Return the argument parser of the command line.
+    '''
+    root = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    root.add_argument('--profile', metavar='FILE',
+                      help='write timings to FILE (see instrument.py)')
+    commands = root.add_subparsers(dest='command', required=True)
+
+    analysis = argparse.ArgumentParser(add_help=False)
+    analysis.add_argument('--output-dir', default='.')
+    analysis.add_argument('--format', choices=sorted(FORMATS),
+                          default='text')
+    analysis.add_argument('--no-plots', action='store_true')
+    analysis.add_argument('--chunksize', type=int, default=None)
+    analysis.add_argument('--processes', type=int, default=None,
+                          help='worker processes (charts, bootstrap)')
+    analysis.add_argument('--cache-dir', default=memo.RESULT_DIR)
+    analysis.add_argument('--no-cache', action='store_true')
+
+    command = commands.add_parser('objective-score', parents=[analysis],
+                                  help='objective scores (question 1)')
+    command.add_argument('objectives_file', nargs='?')
+    command.add_argument('--objectives', nargs='*')
+    command.add_argument('--bootstrap', type=int, default=0,
+                         metavar='RESAMPLES',
+                         help='add bootstrap confidence intervals')
+    command.add_argument('--confidence', type=float, default=0.95)
+    command.add_argument('--seed', type=int, default=0)
+    command.set_defaults(run=objective_score)
+
+    command = commands.add_parser('consistent-player', parents=[analysis],
+                                  help='consistent players (question 2)')
+    command.add_argument('players_file', nargs='?')
+    command.set_defaults(run=consistent_player)
+
+    command = commands.add_parser('performance-report', parents=[analysis],
+                                  help='damage per gold of every game of '
+                                       'some players')
+    command.add_argument('players_file', nargs='?',
+                         help='csv, Parquet or SQLite store (.db) file')
+    command.add_argument('--players', nargs='*')
+    command.set_defaults(run=performance_report)
+
+    command = commands.add_parser('rolling-form', parents=[analysis],
+                                  help='rolling damage per gold over the '
+                                       'last games of every player')
+    command.add_argument('players_file', nargs='?')
+    command.add_argument('--players', nargs='*',
+                         help='players to keep and plot (all, unplotted, '
+                              'by default)')
+    command.add_argument('--window', type=int, default=None,
+                         help='games in a window (10 by default)')
+    command.add_argument('--state', metavar='FILE', default=None,
+                         help='keep the windows in FILE, so later runs '
+                              'only add the matches appended since')
+    command.set_defaults(run=rolling_form)
+
+    command = commands.add_parser('all-star', parents=[analysis],
+                                  help='All-Star teams (question 3)')
+    command.add_argument('kda_file', nargs='?')
+    command.add_argument('region_file', nargs='?')
+    command.set_defaults(run=all_star)
+
+    scraper = argparse.ArgumentParser(add_help=False)
+    scraper.add_argument('--output-dir', default='.')
+    scraper.add_argument('--cache-dir', default=None)
+    scraper.add_argument('--offline', action='store_true')
+    scraper.add_argument('--max-age', type=float, default=None,
+                         metavar='SECONDS',
+                         help='reuse cached pages this young without '
+                              'revalidating them')
+    scraper.add_argument('--workers', type=int, default=None)
+
+    staged = argparse.ArgumentParser(add_help=False)
+    staged.add_argument('--stage', choices=['fetch', 'parse'])
+    staged.add_argument('--archive', dest='archive_path', default=None)
+    staged.add_argument('--processes', type=int, default=None)
+
+    command = commands.add_parser('scrape-matches',
+                                  parents=[scraper, staged],
+                                  help='tables of questions 1 and 2')
+    command.add_argument('--restart', dest='resume', action='store_false')
+    command.set_defaults(run=scrape('data_1_and_2'))
+
+    command = commands.add_parser('scrape-players',
+                                  parents=[scraper, staged],
+                                  help='tables of question 3')
+    command.set_defaults(run=scrape('data_3'))
+
+    command = commands.add_parser('crawl', parents=[scraper],
+                                  help='all four tables in one pass')
+    command.add_argument('--restart', dest='resume', action='store_false')
+    command.set_defaults(run=scrape('crawl'))
+    return root
+
+
+def main(argv=None):
+    args = parser().parse_args(argv)
+    if args.profile is None:
+        args.run(args)
+        return
+    import instrument
+    with instrument.profiled(os.path.abspath(args.profile)):
+        args.run(args)
+
+
+if __name__ == '__main__':
+    main()
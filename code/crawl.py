@@ -0,0 +1,91 @@
+'''
+Implements a single crawler that builds all four tables of the project
+in one pass over the tournaments. Both scrapers fetch their webpages
+through one shared frontier, which downloads every batch of urls
+concurrently and counts the urls requested more than once. Every url of
+gol.gg the scrapers use names its tournament (team webpages included),
+so no url repeats and no webpage is kept in memory after it is parsed.
+'''
+import cache
+import data_1_and_2
+import data_3
+import fetch
+from sink import RowSink
+
+
+class Frontier:
+    '''
+    Fetches webpages for the crawl, downloading each batch of urls
+    concurrently. It remembers the urls it has requested only to count
+    the ones requested again, which should stay at 0.
+    '''
+
+    def __init__(self, workers=fetch.WORKERS):
+        '''
+        Take the number of worker threads as parameter.
+        '''
+        self.workers = workers
+        self.seen = set()
+        self.requests = 0
+        self.repeats = 0
+
+    def get_pages(self, urls):
+        '''
+        Take a list of urls as parameter and return the content of every
+        webpage in the same order as the urls, requesting each url once
+        even when it shows up several times in the list. Urls requested
+        again in a later call are counted in repeats.
+        '''
+        todo = list(dict.fromkeys(urls))
+        fetched = dict(zip(todo, fetch.fetch_all(todo, self.workers)))
+        self.requests += len(todo)
+        self.repeats += len(self.seen.intersection(todo))
+        self.seen.update(todo)
+        return [fetched[url] for url in urls]
+
+
+def all_tournaments(sinks, frontier, workers=fetch.WORKERS):
+    '''
+    Take a tuple of the objective, gold and damage, KDA and region sinks,
+    a frontier and the number of worker threads as parameters and crawl
+    every tournament once, writing the rows of all four tables.
+    '''
+    objective_sink, players_sink, kda_sink, region_sink = sinks
+    for tournament in data_1_and_2.get_tournaments():
+        data_1_and_2.single_tournament(tournament, objective_sink,
+                                       players_sink, workers,
+                                       frontier.get_pages)
+        data_3.players_stats(tournament, kda_sink, frontier.get_pages)
+        data_3.players_region(tournament, region_sink, frontier.get_pages)
+
+
+def main(workers=fetch.WORKERS, cache_dir=cache.CACHE_DIR, offline=False,
+         resume=True, max_age=0):
+    '''
+    Crawl every tournament once and store all four tables. The match tables
+    resume from the checkpoint manifest like data_1_and_2.py, while the
+    player tables are written again on every run. All four tables are
+    also stored as typed Parquet files. Cached webpages younger than
+    max_age seconds are used without asking the server again.
+    '''
+    fetch.configure(cache_dir, offline=offline, max_age=max_age)
+    data_1_and_2.load_manifest(resume)
+    frontier = Frontier(workers)
+    with RowSink(data_1_and_2.OBJECTIVE_FILE, data_1_and_2.OBJECTIVE_HEADER,
+                 batch_size=None) as objective_sink, \
+         RowSink(data_1_and_2.PLAYERS_FILE, data_1_and_2.get_players_header(),
+                 batch_size=None) as players_sink, \
+         RowSink(data_3.KDA_FILE, data_3.KDA_HEADER,
+                 append=False) as kda_sink, \
+         RowSink(data_3.REGION_FILE, data_3.REGION_HEADER,
+                 append=False) as region_sink:
+        sinks = (objective_sink, players_sink, kda_sink, region_sink)
+        all_tournaments(sinks, frontier, workers)
+    data_1_and_2.store_tables()
+    data_3.store_tables()
+    print('%d requests, %d urls requested again' % (frontier.requests,
+                                                     frontier.repeats))
+
+
+if __name__ == '__main__':
+    main()
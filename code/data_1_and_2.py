@@ -1,13 +1,38 @@
 '''
 Implements all the procedures to scrap necessary data for the
 1st and 2nd research question from several online webpages.
+Every match that has been stored is recorded in a checkpoint manifest,
+so an interrupted crawl resumes where it stopped and later crawls only
+fetch the matches that are new and append them to the csv files. Rows
+are streamed to the csv files as they are scraped (see sink.py).
+Match webpages are parsed with a SoupStrainer, so only the few tags we
+read from them are built into a tree. The crawl can also run as two
+stages: fetch_stage stores the raw webpages in a compressed archive and
+parse_stage parses the archive on every core (see archive.py).
 '''
-from bs4 import BeautifulSoup
-import requests
-import csv
+from bs4 import BeautifulSoup, SoupStrainer
+import os
+import cache
+import fetch
+import instrument
+from archive import ARCHIVE_FILE, PageArchive, parse_pages
+from sink import RowSink
+import tables
 
-objective_data = []
-players_data = []
+OBJECTIVE_FILE = 'Matches_Objectives.csv'
+PLAYERS_FILE = 'Players_Gold_And_Damage.csv'
+MANIFEST_FILE = 'crawl_manifest.txt'
+OBJECTIVE_HEADER = ['Herald_B', 'Dragon_B', 'Elder_Dragon_B', 'Baron_B',
+                    'Herald_R', 'Dragon_R', 'Elder_Dragon_R', 'Baron_R',
+                    'Win_B', 'Win_R']
+CHECKPOINT_EVERY = 32
+PARSER = 'html.parser'
+SERIES_TAGS = SoupStrainer('a', class_='nav-link')
+OBJECTIVE_TAGS = SoupStrainer(['span', 'div'], class_=[
+    'blue_action', 'red_action', 'col-12 blue-line-header'])
+STATS_TAGS = SoupStrainer('table', class_='completestats tablesaw')
+
+done_matches = set()
 
 
 def get_players_header():
@@ -18,7 +43,7 @@ def get_players_header():
     header = []
     players_pos = ['Top', 'Jun', 'Mid', 'ADC', 'Sup']
     players_side = ['_B', '_R']
-    players_stats = ['_Gold', '_Danmage']
+    players_stats = ['_Gold', '_Damage']
     players = []
     for i in players_side:
         players_one_side = [j+i for j in players_pos]
@@ -30,10 +55,10 @@ def get_players_header():
     return header
 
 
-def all_tournaments():
+def get_tournaments():
     '''
-    Getting the data for both the 1st and 2nd research questions from each
-    year's World Championhip and Mid Season Invitation tournaments.
+    Return the names of each year's World Championhip and Mid Season
+    Invitation tournaments, as they appear in gol.gg urls.
     '''
     tournaments = []
     tournament_type = ['World%20Championship%20201',
@@ -41,60 +66,189 @@ def all_tournaments():
     for i in range(9, 5, -1):
         tournaments.append(tournament_type[0] + str(i))
         tournaments.append(tournament_type[1] + str(i))
-    for tournament in tournaments:
-        single_tournament(tournament)
+    return tournaments
+
+
+def all_tournaments(objective_sink, players_sink, workers=fetch.WORKERS):
+    '''
+    Getting the data for both the 1st and 2nd research questions from each
+    year's World Championhip and Mid Season Invitation tournaments and
+    writing the rows to the two given sinks, using the given number of
+    worker threads to download the webpages. Matches already in the
+    checkpoint manifest are skipped.
+    '''
+    for tournament in get_tournaments():
+        single_tournament(tournament, objective_sink, players_sink, workers)
 
 
-def single_tournament(tournament):
+def tournament_url(tournament):
     '''
-    Take a tournament as parameter to get the webpage of a single tournament
-    and try to go to either a bo1 or bo5 game webpage to get detailed data
-    for research questions.
+    Take a tournament as parameter and return the url of its webpage.
+    '''
+    return fetch.BASE_URL + "/tournament/tournament-stats/" + tournament + '/'
+
+
+def match_url(link):
+    '''
+    Take a link found on gol.gg as parameter and return the full url of
+    the webpage it points to.
+    '''
+    return fetch.BASE_URL + link[2:]
+
+
+def stats_url(link):
     '''
-    url = "https://gol.gg/tournament/tournament-stats/" + tournament + '/'
-    choose_objective_data = int(tournament[-1]) >= 8
-    page = requests.get(url)
-    soup = BeautifulSoup(page.content, 'html.parser')
+    Take a link to a single match(bo1)'s summary as parameter and return the
+    url of the fullstats webpage of that match.
+    '''
+    return fetch.BASE_URL + link[2:-5] + 'fullstats/'
+
+
+def tournament_matches(page, get_pages):
+    '''
+    Take the content of a tournament's webpage and a function returning the
+    content of a list of urls as parameters and return the links of every
+    bo1 game in that tournament (going through the bo5 webpages when needed)
+    in the order they appear on the tournament webpage.
+    '''
+    soup = BeautifulSoup(page, 'html.parser')
     table = soup.find_all(
         'table', class_='table_list footable toggle-square-filled')[1]
-    for new_link_raw in table.find_all('a'):
-        new_link = new_link_raw.get('href')
-        if 'summary' in new_link:
-            bo5(new_link, choose_objective_data)
+    links = [new_link.get('href') for new_link in table.find_all('a')]
+    series = [link for link in links if 'summary' in link]
+    series_pages = get_pages([match_url(link) for link in series])
+    series_matches = dict(zip(series, [bo5(page) for page in series_pages]))
+    matches = []
+    for link in links:
+        if 'summary' in link:
+            matches.extend(series_matches[link])
+        else:
+            matches.append(link)
+    return matches
+
+
+def match_urls(tournament, matches):
+    '''
+    Take a tournament and the links of its bo1 games as parameters and
+    return the urls of the fullstats webpages of those games, followed by
+    their summary webpages when the tournament is used for the 1st research
+    question.
+    '''
+    urls = [stats_url(link) for link in matches]
+    if int(tournament[-1]) >= 8:
+        urls.extend([match_url(link) for link in matches])
+    return urls
+
+
+def single_tournament(tournament, objective_sink, players_sink,
+                      workers=fetch.WORKERS, get_pages=None):
+    '''
+    Take a tournament, the sinks of the two tables, the number of worker
+    threads and optionally a function returning the content of a list of
+    urls as parameters to get the webpage of a single tournament, find
+    every bo1 game in it that is not in the checkpoint manifest yet and get
+    detailed data for research questions. Webpages are downloaded
+    concurrently, but the rows are written in the same order as the games
+    appear on the tournament webpage, and a checkpoint is written after
+    every CHECKPOINT_EVERY games. The sinks should only write their rows
+    when flushed, so no row reaches disk before its match is checkpointed.
+    '''
+    if get_pages is None:
+        def get_pages(urls):
+            return fetch.fetch_all(urls, workers)
+    page = get_pages([tournament_url(tournament)])[0]
+    matches = tournament_matches(page, get_pages)
+    matches = [link for link in matches if link not in done_matches]
+    for i in range(0, len(matches), CHECKPOINT_EVERY):
+        batch = matches[i:i + CHECKPOINT_EVERY]
+        pages = get_pages(match_urls(tournament, batch))
+        for page in pages[:len(batch)]:
+            players_sink.write(bo1_players_stats(page))
+        for page in pages[len(batch):]:
+            objective_sink.write(bo1_objective(page))
+        checkpoint(batch, objective_sink, players_sink)
+
+
+def fetch_stage(archive_path=ARCHIVE_FILE, workers=fetch.WORKERS):
+    '''
+    Take the path of a page archive and the number of worker threads as
+    parameters and download every webpage needed for the 1st and 2nd
+    research questions into the archive without parsing the matches.
+    Webpages already in the archive are not downloaded again.
+    '''
+    with PageArchive(archive_path, 'a') as archive:
+        def get_pages(urls):
+            missing = [url for url in urls if url not in archive]
+            for i in range(0, len(missing), CHECKPOINT_EVERY):
+                batch = missing[i:i + CHECKPOINT_EVERY]
+                for url, page in zip(batch, fetch.fetch_all(batch, workers)):
+                    archive.put(url, page)
+            return [archive.get(url) for url in urls]
+
+        for tournament in get_tournaments():
+            page = get_pages([tournament_url(tournament)])[0]
+            matches = tournament_matches(page, get_pages)
+            get_pages(match_urls(tournament, matches))
+
+
+def parse_stage(objective_sink, players_sink, archive_path=ARCHIVE_FILE,
+                processes=None):
+    '''
+    Take the sinks of the two tables, the path of a page archive filled by
+    fetch_stage and the number of worker processes as parameters, parse
+    every archived match with a process pool and write the rows to the
+    sinks in the same order as a normal crawl. Returns the links of the
+    parsed matches.
+    '''
+    jobs = []
+    parsed = []
+    with PageArchive(archive_path) as archive:
+        def get_pages(urls):
+            return [archive.get(url) for url in urls]
+
+        for tournament in get_tournaments():
+            matches = tournament_matches(
+                archive.get(tournament_url(tournament)), get_pages)
+            urls = match_urls(tournament, matches)
+            parsed.extend(matches)
+            jobs.extend((bo1_players_stats, url, ())
+                        for url in urls[:len(matches)])
+            jobs.extend((bo1_objective, url, ())
+                        for url in urls[len(matches):])
+    rows = parse_pages(archive_path, jobs, processes)
+    for job, row in zip(jobs, rows):
+        if job[0] is bo1_objective:
+            objective_sink.write(row)
         else:
-            bo1_players_stats(new_link)
-            if choose_objective_data:
-                bo1_objective(new_link)
+            players_sink.write(row)
+    return parsed
 
 
-def bo5(link, choose_objective_data):
+@instrument.timed('parse')
+def bo5(page, parser=PARSER, strained=True):
     '''
-    Take a link and a boolean choose_objective_data which decides whether
-    go to that webpage about 1st research questions's data as parameters and
-    try to go to each game's webpage in that bo5 game to get detailed data
-    for research questions.
+    Take the content of a bo5 game's webpage, the name of the html parser
+    and whether to only parse the tags we need as parameters and return
+    the links to the webpage of each game in that bo5 game.
     '''
-    url = 'https://gol.gg' + link[2:]
-    page = requests.get(url)
-    soup = BeautifulSoup(page.content, 'html.parser')
+    soup = BeautifulSoup(page, parser,
+                         parse_only=SERIES_TAGS if strained else None)
     nav_link = soup.find_all('a', class_='nav-link')
     matches = nav_link[9:len(nav_link) - 1]
-    for new_link in matches:
-        bo1_players_stats(new_link.get('href'))
-        if choose_objective_data:
-            bo1_objective(new_link.get('href'))
+    return [new_link.get('href') for new_link in matches]
 
 
-def bo1_objective(link):
+@instrument.timed('parse')
+def bo1_objective(page, parser=PARSER, strained=True):
     '''
-    Take a link as parameter to get the webpage about single match(bo1)'s
-    summary and scrap red side's and blue side's natural objectives they got
-    in that match as the data for the 1st research question
+    Take the content of a single match(bo1)'s summary webpage, the name of
+    the html parser and whether to only parse the tags we need as
+    parameters and return red side's and blue side's natural objectives
+    they got in that match as a row of data for the 1st research question
     '''
-    url = 'https://gol.gg' + link[2:]
-    page = requests.get(url)
     row = [0, 0, 0, 0, 0, 0, 0, 0, 0, 0]
-    soup = BeautifulSoup(page.content, 'html.parser')
+    soup = BeautifulSoup(page, parser,
+                         parse_only=OBJECTIVE_TAGS if strained else None)
     blue = soup.find_all('span', class_='blue_action')
     red = soup.find_all('span', class_='red_action')
     for i in blue:
@@ -121,18 +275,19 @@ def bo1_objective(link):
         row[8] = 1
     else:
         row[9] = 1
-    objective_data.append(row)
+    return row
 
 
-def bo1_players_stats(link):
+@instrument.timed('parse')
+def bo1_players_stats(page, parser=PARSER, strained=True):
     '''
-    Take a link as parameter to get the webpage about single match(bo1)'s
-    stats and scrap all player names, golds and total damage to champion from
-    that match as data for the 2nd research question
+    Take the content of a single match(bo1)'s fullstats webpage, the name
+    of the html parser and whether to only parse the tags we need as
+    parameters and return all player names, golds and total damage to
+    champion from that match as a row of data for the 2nd research question
     '''
-    url = 'https://gol.gg' + link[2:-5] + 'fullstats/'
-    page = requests.get(url)
-    soup = BeautifulSoup(page.content, 'html.parser')
+    soup = BeautifulSoup(page, parser,
+                         parse_only=STATS_TAGS if strained else None)
     table = soup.find('table', class_='completestats tablesaw')
     table_rows = table.find_all('tr')
     row = []
@@ -144,28 +299,96 @@ def bo1_players_stats(link):
                col_name == 'Total damage to Champion'):
                 row_part = [i.text.strip() for i in td[1:]]
                 row.extend(row_part)
-    players_data.append(row)
+    return row
 
 
-def store_data(filename, data, header):
+def checkpoint(matches, objective_sink, players_sink):
     '''
-    Take filename, data and header as parameters and store all the information
-    into the csv file with the given filename.
+    Take the links of the matches whose rows were just scraped and the sinks
+    of the two tables as parameters, make sure those rows are on disk and
+    then record the matches in the checkpoint manifest, so they are never
+    fetched again.
     '''
-    with open(filename, 'w') as file:
-        writer = csv.writer(file)
-        writer.writerow(header)
-        writer.writerows(data)
+    objective_sink.flush()
+    players_sink.flush()
+    with open(MANIFEST_FILE, 'a') as file:
+        for link in matches:
+            file.write(link + '\n')
+    done_matches.update(matches)
 
 
-def main():
-    players_header = get_players_header()
-    objective_header = ['Herald_B', 'Dragon_B', 'Elder_Dragon_B', 'Baron_B',
-                        'Herald_R', 'Dragon_R', 'Elder_Dragon_R', 'Baron_R',
-                        'Win_B', 'Win_R']
-    all_tournaments()
-    store_data('Matches_Objectives.csv', objective_data, objective_header)
-    store_data('Players_Gold_And_Damage.csv', players_data, players_header)
+def write_manifest(matches):
+    '''
+    Take the links of every match in the csv files as parameter and write
+    the checkpoint manifest again with exactly those matches, so a later
+    crawl resuming from it does not scrape them again.
+    '''
+    with open(MANIFEST_FILE + '.part', 'w') as file:
+        for link in matches:
+            file.write(link + '\n')
+    os.replace(MANIFEST_FILE + '.part', MANIFEST_FILE)
+    done_matches.clear()
+    done_matches.update(matches)
+
+
+def load_manifest(resume):
+    '''
+    Take a boolean resume as parameter and load the matches recorded in the
+    checkpoint manifest. Without a manifest to resume from, the csv files
+    and the manifest are started over so no row is stored twice.
+    '''
+    done_matches.clear()
+    if resume and os.path.exists(MANIFEST_FILE):
+        with open(MANIFEST_FILE) as file:
+            done_matches.update(line.strip() for line in file if line.strip())
+    else:
+        for filename in (OBJECTIVE_FILE, PLAYERS_FILE, MANIFEST_FILE):
+            if os.path.exists(filename):
+                os.remove(filename)
+
+
+def main(workers=fetch.WORKERS, cache_dir=cache.CACHE_DIR, offline=False,
+         resume=True, stage=None, archive_path=ARCHIVE_FILE, processes=None,
+         max_age=0):
+    '''
+    Crawl the tournaments and store the tables for the 1st and 2nd research
+    questions. With stage set to 'fetch' the webpages are only downloaded
+    into the page archive, and with stage set to 'parse' the tables are
+    built again from the archive without any network, along with the
+    checkpoint manifest. The finished tables are also stored as typed
+    Parquet files. Cached webpages younger than max_age seconds are used
+    without asking the server again.
+    '''
+    fetch.configure(cache_dir, offline=offline, max_age=max_age)
+    if stage == 'fetch':
+        fetch_stage(archive_path, workers)
+        return
+    if stage == 'parse':
+        with RowSink(OBJECTIVE_FILE, OBJECTIVE_HEADER,
+                     append=False) as objective_sink, \
+             RowSink(PLAYERS_FILE, get_players_header(),
+                     append=False) as players_sink:
+            parsed = parse_stage(objective_sink, players_sink,
+                                 archive_path, processes)
+        write_manifest(parsed)
+    else:
+        # Rows only reach the csv files at checkpoints, together with the
+        # matches they come from in the manifest
+        load_manifest(resume)
+        with RowSink(OBJECTIVE_FILE, OBJECTIVE_HEADER,
+                     batch_size=None) as objective_sink, \
+             RowSink(PLAYERS_FILE, get_players_header(),
+                     batch_size=None) as players_sink:
+            all_tournaments(objective_sink, players_sink, workers)
+    store_tables()
+
+
+def store_tables():
+    '''
+    Store the typed Parquet files of both tables from their csv files.
+    '''
+    tables.store(OBJECTIVE_FILE, 'objectives')
+    tables.store(PLAYERS_FILE, 'players')
 
 
 if __name__ == '__main__':
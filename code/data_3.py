@@ -1,81 +1,148 @@
 from bs4 import BeautifulSoup
-import requests
-import csv
-
-region_data = []
-players_data = []
-
-
-def all_tournaments():
-    tournaments = []
-    tournament_type = ['World%20Championship%20201',
-                       'Mid-Season%20Invitational%20201']
-    for i in range(9, 5, -1):
-        tournaments.append(tournament_type[0] + str(i))
-        tournaments.append(tournament_type[1] + str(i))
-    for tournament in tournaments:
-        players_stats(tournament)
-        players_region(tournament)
-
-
-def players_stats(tournament):
-    url = "https://gol.gg/players/list/season-ALL/split-ALL/tournament-" + (
-           tournament) + "/position-ALL/week-ALL/"
-    page = requests.get(url)
-    soup = BeautifulSoup(page.content, 'html.parser')
+import cache
+import fetch
+import instrument
+from archive import ARCHIVE_FILE, PageArchive, parse_pages
+from data_1_and_2 import get_tournaments
+from sink import RowSink
+import tables
+
+REGION_FILE = 'Players_Region.csv'
+KDA_FILE = 'Players_KDA_And_Winrate.csv'
+REGION_HEADER = ['Player', 'Region']
+KDA_HEADER = ['Player', 'Position', 'Games', 'Win rate', 'KDA']
+
+
+def all_tournaments(region_sink, players_sink, workers=fetch.WORKERS):
+    def get_pages(urls):
+        return fetch.fetch_all(urls, workers)
+
+    for tournament in get_tournaments():
+        players_stats(tournament, players_sink, get_pages)
+        players_region(tournament, region_sink, get_pages)
+
+
+def players_url(tournament):
+    return fetch.BASE_URL + "/players/list/season-ALL/split-ALL/" + (
+           "tournament-" + tournament + "/position-ALL/week-ALL/")
+
+
+def teams_url(tournament):
+    return fetch.BASE_URL + "/teams/list/season-ALL/split-ALL/" + (
+           "region-ALL/tournament-" + tournament + "/week-ALL/")
+
+
+def team_url(link):
+    return fetch.BASE_URL + '/teams' + '%20'.join(link[1:].split())
+
+
+def players_stats(tournament, sink, get_pages=fetch.fetch_all):
+    for row in players_list(get_pages([players_url(tournament)])[0]):
+        sink.write(row)
+
+
+@instrument.timed('parse')
+def players_list(page):
+    soup = BeautifulSoup(page, 'html.parser')
     table = soup.find('table', class_='table_list playerslist ' + (
                       'tablesaw trhover'))
     table_rows = table.find_all('tr')
+    rows = []
     for tr in table_rows:
         td = tr.find_all('td')
         if td:
             row = [i.text for i in td]
-            players_data.append(row[0:5])
+            rows.append(row[0:5])
+    return rows
+
+
+def players_region(tournament, sink, get_pages=fetch.fetch_all):
+    teams = teams_list(get_pages([teams_url(tournament)])[0])
+    pages = get_pages([team_url(link) for link, _ in teams])
+    for (link, region), page in zip(teams, pages):
+        for row in players_name(page, region):
+            sink.write(row)
 
 
-def players_region(tournament):
-    url = "https://gol.gg/teams/list/season-ALL/split-ALL/region-ALL/" + (
-          "tournament-" + tournament + "/week-ALL/")
-    page = requests.get(url)
-    soup = BeautifulSoup(page.content, 'html.parser')
+@instrument.timed('parse')
+def teams_list(page):
+    soup = BeautifulSoup(page, 'html.parser')
     table = soup.find('table', class_='table_list playerslist ' + (
                       'tablesaw trhover'))
     table_rows = table.find_all('tr')
+    teams = []
     for tr in table_rows:
         td = tr.find_all('td')
         if td:
             new_link = td[0].find('a').get('href')
             region = td[2].text
-            players_name(new_link, region)
+            teams.append((new_link, region))
+    return teams
 
 
-def players_name(link, region):
-    url = 'https://gol.gg/teams' + '%20'.join(link[1:].split())
-    page = requests.get(url)
-    soup = BeautifulSoup(page.content, 'html.parser')
+@instrument.timed('parse')
+def players_name(page, region):
+    soup = BeautifulSoup(page, 'html.parser')
     table = soup.find('table', class_='table_list footable ' + (
                       'toggle-square-filled'))
     table_rows = table.find_all('tr')
+    rows = []
     for tr in table_rows:
         td = tr.find_all('td')
         if (len(td) > 2):
             temp = [td[1].text.strip(), region]
-            region_data.append(temp)
+            rows.append(temp)
+    return rows
+
+
+def fetch_stage(archive_path=ARCHIVE_FILE, workers=fetch.WORKERS):
+    with PageArchive(archive_path, 'a') as archive:
+        def get_pages(urls):
+            missing = [url for url in urls if url not in archive]
+            for url, page in zip(missing, fetch.fetch_all(missing, workers)):
+                archive.put(url, page)
+            return [archive.get(url) for url in urls]
+
+        for tournament in get_tournaments():
+            get_pages([players_url(tournament)])
+            teams = teams_list(get_pages([teams_url(tournament)])[0])
+            get_pages([team_url(link) for link, _ in teams])
+
+
+def parse_stage(region_sink, players_sink, archive_path=ARCHIVE_FILE,
+                processes=None):
+    jobs = []
+    with PageArchive(archive_path) as archive:
+        for tournament in get_tournaments():
+            jobs.append((players_list, players_url(tournament), ()))
+            teams = teams_list(archive.get(teams_url(tournament)))
+            jobs.extend((players_name, team_url(link), (region,))
+                        for link, region in teams)
+    for job, rows in zip(jobs, parse_pages(archive_path, jobs, processes)):
+        sink = players_sink if job[0] is players_list else region_sink
+        for row in rows:
+            sink.write(row)
 
 
-def store_data(filename, data, header):
-    with open(filename, 'w') as file:
-        writer = csv.writer(file)
-        writer.writerow(header)
-        writer.writerows(data)
+def main(cache_dir=cache.CACHE_DIR, offline=False, stage=None,
+         archive_path=ARCHIVE_FILE, workers=fetch.WORKERS, processes=None,
+         max_age=0):
+    fetch.configure(cache_dir, offline=offline, max_age=max_age)
+    if stage == 'fetch':
+        fetch_stage(archive_path, workers)
+        return
+    with RowSink(REGION_FILE, REGION_HEADER, append=False) as region_sink, \
+         RowSink(KDA_FILE, KDA_HEADER, append=False) as players_sink:
+        if stage == 'parse':
+            parse_stage(region_sink, players_sink, archive_path, processes)
+        else:
+            all_tournaments(region_sink, players_sink, workers)
+    store_tables()
 
 
-def main():
-    region_header = ['Player', 'Region']
-    players_header = ['Player', 'Position', 'Games', 'Win rate', 'KDA']
-    all_tournaments()
-    store_data('Players_Region.csv', region_data, region_header)
-    store_data('Players_KDA_And_Winrate.csv', players_data, players_header)
+def store_tables():
+    tables.store(REGION_FILE, 'region')
+    tables.store(KDA_FILE, 'kda')
 
 
 if __name__ == '__main__':
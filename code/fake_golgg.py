@@ -0,0 +1,250 @@
+'''
+Implements a local stand-in for gol.gg, used to load test the scrapers.
+It serves synthetic tournament, bo5 summary, match summary, fullstats,
+players list, teams list and team webpages in the same html shapes the
+scrapers parse. Every page is generated from its url with a seeded random
+generator, so the same url always gives the same page, served with an
+ETag so cached pages can be revalidated. Each response can
+be delayed and a fraction of them can fail with a 503 status, optionally
+with a Retry-After header.
+
+Usage: python fake_golgg.py [port] [latency] [failure_rate]
+'''
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+import random
+import re
+import sys
+import threading
+import time
+import zlib
+
+POSITIONS = ['TOP', 'JUNGLE', 'MID', 'ADC', 'SUPPORT']
+REGIONS = ['KR', 'CN', 'EUW', 'NA', 'TW', 'VN']
+OBJECTIVES = ['Nashor', 'Rift Herald', 'Elder Drake', 'Ocean Drake',
+              'Infernal Drake', 'Mountain Drake', 'Cloud Drake', 'Tower']
+TEAMS = 12
+FILLER = '<div class="row"><p class="text">gol.gg <a href="#">link</a></p>' + (
+         '</div>')
+
+
+class FakeSite:
+    '''
+    Generates the synthetic webpages of the fake site. matches is the
+    number of entries in a tournament's match list, every fourth of them
+    being a bo5 series of three games, and padding is the number of filler
+    blocks added around every page to give it a realistic size.
+    '''
+
+    def __init__(self, matches=20, seed=0, padding=200):
+        self.matches = matches
+        self.seed = seed
+        self.padding = padding
+
+    def _random(self, key):
+        '''
+        Take a string as parameter and return a random generator seeded
+        with it, so the same key always gives the same page.
+        '''
+        return random.Random(zlib.crc32(key.encode('utf-8')) + self.seed)
+
+    def _wrap(self, body):
+        '''
+        Take the body of a page as parameter and return the full page.
+        '''
+        filler = FILLER * self.padding
+        return ('<html><head><title>gol.gg</title></head><body>' + filler +
+                body + filler + '</body></html>').encode('utf-8')
+
+    def team_players(self, team):
+        '''
+        Take the id of a team as parameter and return its five players.
+        '''
+        return ['Team%d%s' % (team, position.title()[:3])
+                for position in POSITIONS]
+
+    def tournament(self, name):
+        rng = self._random(name)
+        links = []
+        for i in range(self.matches):
+            game = rng.randrange(10 ** 6)
+            kind = 'page-summary' if i % 4 == 3 else 'page-game'
+            links.append('<tr><td><a href="../game/stats/%d/%s/">%s</a>'
+                         '</td></tr>' % (game, kind, name))
+        table = '<table class="table_list footable toggle-square-filled">'
+        return self._wrap(table + '<tr><td>Stats</td></tr></table>' +
+                          table + ''.join(links) + '</table>')
+
+    def summary(self, game):
+        nav = ['<a class="nav-link" href="#">Menu</a>'] * 9
+        for i in range(1, 4):
+            nav.append('<a class="nav-link" href="../game/stats/%d/'
+                       'page-game/">Game %d</a>' % (game * 10 + i, i))
+        nav.append('<a class="nav-link" href="#">Timeline</a>')
+        return self._wrap(''.join(nav))
+
+    def game(self, game):
+        rng = self._random('game%d' % game)
+        result = rng.choice(['WIN', 'LOSS'])
+        spans = []
+        for _ in range(rng.randrange(5, 15)):
+            side = rng.choice(['blue_action', 'red_action'])
+            spans.append('<span class="%s"><img alt="%s" src="x.png"/>'
+                         '</span>' % (side, rng.choice(OBJECTIVES)))
+        return self._wrap('<div class="col-12 blue-line-header">Team - ' +
+                          result + '</div>' + ''.join(spans))
+
+    def fullstats(self, game):
+        rng = self._random('stats%d' % game)
+        blue, red = rng.sample(range(TEAMS), 2)
+        players = self.team_players(blue) + self.team_players(red)
+        rows = [('Player', players),
+                ('Kills', [rng.randrange(10) for _ in players]),
+                ('Golds', [rng.randrange(5000, 20000) for _ in players]),
+                ('Total damage to Champion',
+                 [rng.randrange(2000, 40000) for _ in players])]
+        html = ['<table class="completestats tablesaw"><tr><th></th></tr>']
+        for name, values in rows:
+            html.append('<tr><td>%s</td>%s</tr>' % (name, ''.join(
+                        '<td> %s </td>' % value for value in values)))
+        return self._wrap(''.join(html) + '</table>')
+
+    def players_list(self, tournament):
+        rng = self._random('players' + tournament)
+        rows = []
+        for team in range(TEAMS):
+            for player, position in zip(self.team_players(team), POSITIONS):
+                kda = rng.choice(['-', '%.1f' % rng.uniform(0.5, 8)])
+                rows.append('<tr><td>%s</td><td>%s</td><td>%d</td>'
+                            '<td>%d%%</td><td>%s</td><td>0</td></tr>' % (
+                                player, position, rng.randrange(1, 20),
+                                rng.randrange(101), kda))
+        return self._wrap('<table class="table_list playerslist tablesaw '
+                          'trhover"><tr><th>Player</th></tr>' +
+                          ''.join(rows) + '</table>')
+
+    def teams_list(self, tournament):
+        rows = []
+        for team in range(TEAMS):
+            rows.append('<tr><td><a href="./team-stats/%d/split-ALL/'
+                        'tournament-%s/">Team %d</a></td><td>S</td>'
+                        '<td>%s</td></tr>' % (team, unquote(tournament),
+                                              team, REGIONS[team % 6]))
+        return self._wrap('<table class="table_list playerslist tablesaw '
+                          'trhover"><tr><th>Team</th></tr>' +
+                          ''.join(rows) + '</table>')
+
+    def team(self, team):
+        rows = ['<tr><td>%s</td><td>%s</td><td>5</td></tr>' % (
+                position, player) for player, position in zip(
+                self.team_players(team), POSITIONS)]
+        return self._wrap('<table class="table_list footable '
+                          'toggle-square-filled"><tr><th>Roster</th></tr>' +
+                          ''.join(rows) + '</table>')
+
+    def page(self, path):
+        '''
+        Take the path of a request as parameter and return the content of
+        its webpage, or None when the path is not part of the site.
+        '''
+        path = unquote(path)
+        match = re.match(r'/tournament/tournament-stats/(.+)/$', path)
+        if match:
+            return self.tournament(match.group(1))
+        match = re.match(r'/game/stats/(\d+)/page-(\w+)/$', path)
+        if match:
+            game = int(match.group(1))
+            kind = match.group(2)
+            if kind == 'summary':
+                return self.summary(game)
+            if kind == 'game':
+                return self.game(game)
+            if kind == 'fullstats':
+                return self.fullstats(game)
+        match = re.match(r'/players/list/.*/tournament-(.+)/position', path)
+        if match:
+            return self.players_list(match.group(1))
+        match = re.match(r'/teams/list/.*/tournament-(.+)/week', path)
+        if match:
+            return self.teams_list(match.group(1))
+        match = re.match(r'/teams/team-stats/(\d+)/', path)
+        if match:
+            return self.team(int(match.group(1)))
+        return None
+
+
+def make_handler(site, latency, failure_rate, retry_after=None):
+    '''
+    Take a fake site, the mean delay of a response in seconds, the
+    fraction of requests to fail and the Retry-After seconds sent with a
+    failure (None to send none) as parameters and return a request handler
+    class serving that site.
+    '''
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # The headers and the body are separate writes, which Nagle's
+        # algorithm would hold back on a kept-alive connection
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            if latency > 0:
+                time.sleep(random.expovariate(1 / latency))
+            content = site.page(self.path)
+            if random.random() < failure_rate:
+                status, content = 503, b'Service Unavailable'
+            elif content is None:
+                status, content = 404, b'Not Found'
+            else:
+                status = 200
+            etag = '"%08x"' % zlib.crc32(content)
+            if status == 200 and self.headers.get('If-None-Match') == etag:
+                status, content = 304, b''
+            self.send_response(status)
+            if status == 503 and retry_after is not None:
+                self.send_header('Retry-After', str(retry_after))
+            if status in (200, 304):
+                self.send_header('ETag', etag)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def start_server(port=0, latency=0.0, failure_rate=0.0, matches=20,
+                 seed=0, retry_after=None):
+    '''
+    Take a port (0 picks a free one), the mean response delay in seconds,
+    the fraction of failed requests, the number of matches per tournament,
+    a seed and the Retry-After seconds of a failure as parameters, start
+    the fake site in a background thread and return the server and its
+    base url.
+    '''
+    site = FakeSite(matches, seed)
+    server = ThreadingHTTPServer(('127.0.0.1', port),
+                                 make_handler(site, latency, failure_rate,
+                                              retry_after))
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, 'http://127.0.0.1:%d' % server.server_address[1]
+
+
+def main():
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8000
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.0
+    failure_rate = float(sys.argv[3]) if len(sys.argv) > 3 else 0.0
+    server, url = start_server(port, latency, failure_rate)
+    print('Serving fake gol.gg at ' + url)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
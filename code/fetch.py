@@ -0,0 +1,120 @@
+'''
+Implements the shared page fetching helpers used by the scrapers. Every
+host gets one pooled requests session so repeated requests reuse their
+connections, and fetch_all downloads a list of pages with a bounded
+thread pool while keeping the results in the same order as the urls.
+Pages can also be served from an on-disk cache (see cache.py), either
+revalidated against the server or replayed offline without any network.
+Every request goes through the per-host scheduler in throttle.py.
+'''
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from cache import PageCache
+import instrument
+import throttle
+
+BASE_URL = 'https://gol.gg'
+# One worker thread for every request the adaptive limit of a host can
+# let through, so growing the limit really adds concurrency
+WORKERS = throttle.MAX_LIMIT
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+_cache = None
+_offline = False
+_max_age = 0
+
+
+class OfflineCacheMiss(LookupError):
+    '''
+    Raised when a webpage is requested in offline mode but is not cached.
+    '''
+
+
+def configure(cache_dir=None, max_bytes=None, offline=False, max_age=0):
+    '''
+    Take the directory of the page cache, its maximum size in bytes, whether
+    to replay pages from the cache only and how many seconds a cached page
+    is trusted without revalidation as parameters. Passing no cache
+    directory turns the cache off.
+    '''
+    global _cache, _offline, _max_age
+    if offline and cache_dir is None:
+        raise ValueError('offline mode needs a cache directory')
+    if cache_dir is None:
+        _cache = None
+    elif max_bytes is None:
+        _cache = PageCache(cache_dir)
+    else:
+        _cache = PageCache(cache_dir, max_bytes)
+    _offline = offline
+    _max_age = max_age
+
+
+def get_session(url):
+    '''
+    Take a url as parameter and return the pooled session for its host,
+    creating it the first time the host is seen. The connection pool is
+    sized so every request the host's limit lets through (at most
+    throttle.MAX_LIMIT) can keep its own connection open.
+    '''
+    host = urlsplit(url).netloc
+    with _sessions_lock:
+        session = _sessions.get(host)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1,
+                                  pool_maxsize=throttle.MAX_LIMIT)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _sessions[host] = session
+    return session
+
+
+def get_page(url):
+    '''
+    Take a url as parameter and return the raw content of that webpage,
+    downloaded through the pooled session of its host. When the cache is
+    on, a cached page is revalidated with a conditional request and only
+    downloaded again when the server reports that it changed.
+    '''
+    if _cache is None:
+        return throttle.request(get_session(url), url).content
+    entry = _cache.lookup(url)
+    if _offline:
+        if entry is None:
+            raise OfflineCacheMiss(url)
+        return entry[0]
+    headers = {}
+    if entry is not None:
+        content, meta = entry
+        if time.time() - meta.get('stored', 0) < _max_age:
+            instrument.count('page_cache_hits_total')
+            return content
+        headers = _cache.validators(meta)
+    response = throttle.request(get_session(url), url, headers)
+    if response.status_code == 304 and entry is not None:
+        instrument.count('page_cache_revalidated_total')
+        _cache.refresh(url)
+        return entry[0]
+    if response.status_code == 200:
+        _cache.store(url, response.content, response.headers)
+    return response.content
+
+
+@instrument.timed('fetch')
+def fetch_all(urls, workers=WORKERS):
+    '''
+    Take a list of urls and the number of worker threads as parameters and
+    return the content of every webpage in the same order as the urls.
+    With a single worker the pages are downloaded one at a time.
+    '''
+    urls = list(urls)
+    if workers <= 1 or len(urls) <= 1:
+        return [get_page(url) for url in urls]
+    with ThreadPoolExecutor(max_workers=min(workers, len(urls))) as pool:
+        return list(pool.map(get_page, urls))
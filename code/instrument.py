@@ -0,0 +1,313 @@
+'''
+Implements lightweight instrumentation for the scrapers and the analyses.
+Stages are timed with spans (a context manager, a decorator or a wrapped
+iterator), which record how often a stage ran, its total and longest
+time and the peak memory of the process when it ended. HTTP requests
+are counted with their bytes and their latency is kept in a histogram
+for every type of url (tournament, summary, fullstats, team, players and
+teams lists). The measurements are reported as json or as Prometheus
+text. While instrumentation is disabled, which is the default, every
+hook returns after checking one flag.
+
+Usage: python instrument.py OUTPUT MODULE
+Runs the main function of MODULE with instrumentation enabled and writes
+the report to OUTPUT (json when it ends with .json, Prometheus text
+otherwise).
+'''
+from contextlib import contextmanager
+import functools
+import importlib
+import json
+import resource
+import sys
+import threading
+import time
+
+ENABLED = False
+BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+           float('inf')]
+URL_TYPES = [('page-fullstats', 'fullstats'), ('page-summary', 'summary'),
+             ('page-game', 'summary'), ('/tournament/', 'tournament'),
+             ('/teams/team-stats/', 'team'), ('/players/list/', 'players'),
+             ('/teams/list/', 'teams')]
+
+_lock = threading.Lock()
+spans = {}
+counters = {}
+histograms = {}
+
+
+class _NullSpan:
+    '''
+    The span returned while instrumentation is disabled, which does
+    nothing.
+    '''
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+class _Span:
+    '''
+    Times one run of a stage and records it when it ends.
+    '''
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def enable():
+    '''
+    Start recording measurements.
+    '''
+    global ENABLED
+    ENABLED = True
+
+
+def disable():
+    '''
+    Stop recording measurements.
+    '''
+    global ENABLED
+    ENABLED = False
+
+
+def reset():
+    '''
+    Forget every measurement recorded so far.
+    '''
+    with _lock:
+        spans.clear()
+        counters.clear()
+        histograms.clear()
+
+
+def peak_memory():
+    '''
+    Return the peak resident memory of this process in bytes.
+    '''
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def record(name, seconds):
+    '''
+    Take the name of a stage and the seconds one run of it took as
+    parameters and record that run.
+    '''
+    memory = peak_memory()
+    with _lock:
+        stats = spans.setdefault(name, {'count': 0, 'seconds': 0.0,
+                                        'max_seconds': 0.0,
+                                        'peak_memory_bytes': 0})
+        stats['count'] += 1
+        stats['seconds'] += seconds
+        stats['max_seconds'] = max(stats['max_seconds'], seconds)
+        stats['peak_memory_bytes'] = max(stats['peak_memory_bytes'], memory)
+
+
+def span(name):
+    '''
+    Take the name of a stage as parameter and return a context manager
+    timing the code it wraps as one run of that stage.
+    '''
+    if not ENABLED:
+        return _NULL_SPAN
+    return _Span(name)
+
+
+def timed(name):
+    '''
+    Take the name of a stage as parameter and return a decorator timing
+    every call of the function it decorates as one run of that stage.
+    '''
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return function(*args, **kwargs)
+            with _Span(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def iterate(name, function, *args):
+    '''
+    Take the name of a stage, a function returning an iterable and its
+    arguments as parameters and yield the items of the iterable, timing
+    the call of the function and the production of every item as runs of
+    that stage (readers without chunks load everything in the call).
+    '''
+    start = time.perf_counter() if ENABLED else None
+    iterator = iter(function(*args))
+    if start is not None:
+        record(name, time.perf_counter() - start)
+    while True:
+        start = time.perf_counter() if ENABLED else None
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        if start is not None:
+            record(name, time.perf_counter() - start)
+        yield item
+
+
+def count(name, value=1):
+    '''
+    Take the name of a counter and a value as parameters and add the value
+    to the counter.
+    '''
+    if not ENABLED:
+        return
+    with _lock:
+        counters[name] = counters.get(name, 0) + value
+
+
+def observe(name, seconds):
+    '''
+    Take the name of a histogram and a latency in seconds as parameters and
+    add the latency to the histogram.
+    '''
+    if not ENABLED:
+        return
+    with _lock:
+        histogram = histograms.setdefault(name, {
+            'buckets': [0] * len(BUCKETS), 'count': 0, 'sum': 0.0})
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                histogram['buckets'][i] += 1
+                break
+        histogram['count'] += 1
+        histogram['sum'] += seconds
+
+
+def url_type(url):
+    '''
+    Take a url of gol.gg as parameter and return the type of its webpage.
+    '''
+    for part, kind in URL_TYPES:
+        if part in url:
+            return kind
+    return 'other'
+
+
+def http_request(url, seconds, size):
+    '''
+    Take the url of a finished HTTP request, its latency in seconds and
+    the number of bytes it received as parameters and record them.
+    '''
+    if not ENABLED:
+        return
+    kind = url_type(url)
+    count('http_requests_total{type="%s"}' % kind)
+    count('http_bytes_total{type="%s"}' % kind, size)
+    observe('http_latency_seconds{type="%s"}' % kind, seconds)
+
+
+def report_json():
+    '''
+    Return every measurement recorded so far as json text.
+    '''
+    with _lock:
+        return json.dumps({'spans': spans, 'counters': counters,
+                           'histograms': dict(
+                               (name, dict(histogram, bounds=[
+                                   str(bound) for bound in BUCKETS]))
+                               for name, histogram in histograms.items())},
+                          indent=1, sort_keys=True)
+
+
+def _metric(name, suffix, labels=''):
+    '''
+    Take the name of a measurement, with its labels in braces if it has
+    any, a suffix for the metric and extra labels as parameters and return
+    the Prometheus name of the metric with all its labels.
+    '''
+    base, _, own = name.partition('{')
+    own = own.rstrip('}')
+    labels = ','.join(label for label in [own, labels] if label)
+    return base + suffix + ('{' + labels + '}' if labels else '')
+
+
+def report_prometheus():
+    '''
+    Return every measurement recorded so far in the Prometheus text format.
+    '''
+    lines = []
+    with _lock:
+        for name, stats in sorted(spans.items()):
+            stage = 'stage="%s"' % name
+            lines.append('stage_runs_total{%s} %d' % (stage, stats['count']))
+            lines.append('stage_seconds_total{%s} %r' % (stage,
+                                                          stats['seconds']))
+            lines.append('stage_max_seconds{%s} %r' % (
+                         stage, stats['max_seconds']))
+            lines.append('stage_peak_memory_bytes{%s} %d' % (
+                         stage, stats['peak_memory_bytes']))
+        for name, value in sorted(counters.items()):
+            lines.append('%s %r' % (_metric(name, ''), value))
+        for name, histogram in sorted(histograms.items()):
+            total = 0
+            for bound, value in zip(BUCKETS, histogram['buckets']):
+                total += value
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append('%s %d' % (_metric(name, '_bucket',
+                                                'le="%s"' % le), total))
+            lines.append('%s %r' % (_metric(name, '_sum'), histogram['sum']))
+            lines.append('%s %d' % (_metric(name, '_count'),
+                                    histogram['count']))
+    return '\n'.join(lines) + '\n'
+
+
+def write_report(path):
+    '''
+    Take a path as parameter and write the report into it, as json when
+    the path ends with .json and as Prometheus text otherwise.
+    '''
+    text = report_json() if path.endswith('.json') else report_prometheus()
+    with open(path, 'w') as file:
+        file.write(text)
+
+
+@contextmanager
+def profiled(path):
+    '''
+    Take a path as parameter and return a context manager that records
+    the measurements of the code it wraps and writes their report into
+    the path at the end.
+    '''
+    reset()
+    enable()
+    try:
+        yield
+    finally:
+        disable()
+        write_report(path)
+
+
+def main():
+    output, module = sys.argv[1], sys.argv[2]
+    sys.argv = [module] + sys.argv[3:]
+    # Run as a script this file is __main__, not the instrument module the
+    # other modules import and record into
+    with importlib.import_module('instrument').profiled(output):
+        importlib.import_module(module).main()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+Peter Zhong & Tony Song
+CSE 163 Final Project
+This file implements the memoization of analysis results used by
+algorithm.py. A result is stored together with its chart specs under a
+key made of the name of the analysis, the sha1 hash of the content of
+its input files and its parameters, so it is only computed again when
+its own data or parameters change. The results are kept in the same size
+capped, least recently used on-disk store as the scrapers' webpages.
+"""
+
+import hashlib
+import json
+import pickle
+from cache import PageCache
+
+RESULT_DIR = 'result_cache'
+# Changed whenever what the analyses return changes, so results stored by
+# an older version are computed again
+VERSION = 4
+MAX_BYTES = 64 * 1024 * 1024
+BLOCK_SIZE = 1024 * 1024
+
+
+def open_cache(path=RESULT_DIR, max_bytes=MAX_BYTES):
+    """
+    This function takes the directory of the result cache and its maximum
+    size in bytes as parameters and returns the cache, or None when path
+    is None.
+    """
+    if path is None:
+        return None
+    return PageCache(path, max_bytes)
+
+
+def file_hash(path, size=None):
+    """
+    This function takes the path of a file and a number of bytes as
+    parameters and returns the sha1 hash of the first size bytes of the
+    file, or of its whole content when size is None.
+    """
+    digest = hashlib.sha1()
+    left = float('inf') if size is None else size
+    with open(path, 'rb') as file:
+        while left > 0:
+            block = file.read(int(min(BLOCK_SIZE, left)))
+            if not block:
+                break
+            digest.update(block)
+            left -= len(block)
+    return digest.hexdigest()
+
+
+def result_key(name, files, params):
+    """
+    This function takes the name of an analysis, the paths of its input
+    files and a dictionary of its parameters as parameters and returns the
+    key its result is stored under.
+    """
+    content = json.dumps([VERSION, [file_hash(path) for path in files],
+                          params], sort_keys=True)
+    return name + ':' + hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+
+def cached(cache, name, files, params, compute, charts):
+    """
+    This function takes a result cache (or None), the name of an analysis,
+    the paths of its input files, a dictionary of its parameters, a
+    function computing the analysis and a list to collect chart specs in as
+    parameters. compute takes a list to collect its chart specs in and
+    returns the result. The result and its chart specs are taken from the
+    cache when they are stored there, and computed and stored otherwise.
+    The chart specs are added to charts and the result is returned.
+    """
+    key = result_key(name, files, params)
+    entry = None if cache is None else cache.lookup(key)
+    if entry is not None:
+        result, specs = pickle.loads(entry[0])
+    else:
+        specs = []
+        result = compute(specs)
+        if cache is not None:
+            cache.store(key, pickle.dumps((result, specs)), {})
+    charts.extend(specs)
+    return result
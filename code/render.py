@@ -0,0 +1,121 @@
+"""
+Peter Zhong & Tony Song
+CSE 163 Final Project
+This file implements the plot renderer used by algorithm.py. The analyses
+describe every chart they want as a chart spec (a dictionary of plain
+values), and render_charts draws a list of them headless with the Agg
+backend in a pool of processes, closing every figure once it is saved.
+matplotlib is only imported once a chart is drawn, so the analyses can
+build their chart specs without paying for it. A manifest of the spec
+each image was drawn from lets charts whose image is already up to date
+be skipped.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import json
+import os
+import instrument
+
+MANIFEST_FILE = 'plots.json'
+CHUNKSIZE = 4
+
+
+def chart(filename, kind, values, labels=None, title=None, xlabel=None,
+          ylabel=None, color=None, rotation=None, ylim=None):
+    """
+    This function takes the filename of an image, the kind of chart ('bar'
+    or 'line'), the values to plot and the optional tick labels, title,
+    axis labels, color, tick label rotation and y axis limits as parameters
+    and returns the chart spec describing that chart.
+    """
+    return {'filename': filename, 'kind': kind,
+            'values': [float(value) for value in values],
+            'labels': None if labels is None else [str(label)
+                                                   for label in labels],
+            'title': title, 'xlabel': xlabel, 'ylabel': ylabel,
+            'color': color, 'rotation': rotation,
+            'ylim': None if ylim is None else list(ylim)}
+
+
+def render_chart(spec):
+    """
+    This function takes a chart spec as parameter, draws the chart, saves
+    it under the filename of the spec and closes its figure.
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    fig, ax = plt.subplots()
+    try:
+        position = list(range(len(spec['values'])))
+        if spec['kind'] == 'bar':
+            ax.bar(position, spec['values'], align='center',
+                   color=spec['color'])
+        else:
+            ax.plot(position, spec['values'], color=spec['color'])
+        if spec['labels'] is not None:
+            ax.set_xticks(position)
+            ax.set_xticklabels(spec['labels'], rotation=spec['rotation'])
+        if spec['xlabel'] is not None:
+            ax.set_xlabel(spec['xlabel'])
+        if spec['ylabel'] is not None:
+            ax.set_ylabel(spec['ylabel'])
+        if spec['title'] is not None:
+            ax.set_title(spec['title'])
+        if spec['ylim'] is not None:
+            ax.set_ylim(spec['ylim'])
+        fig.savefig(spec['filename'])
+    finally:
+        plt.close(fig)
+    return spec['filename']
+
+
+def spec_key(spec):
+    """
+    This function takes a chart spec as parameter and returns a hash of its
+    content, which changes whenever the chart would look different.
+    """
+    content = json.dumps(spec, sort_keys=True).encode('utf-8')
+    return hashlib.sha1(content).hexdigest()
+
+
+def load_manifest(path):
+    """
+    This function takes the path of a manifest as parameter and returns
+    the dictionary from image filename to spec hash stored in it, or an
+    empty dictionary when there is no manifest.
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path) as file:
+        return json.load(file)
+
+
+@instrument.timed('plot')
+def render_charts(charts, processes=None, force=False,
+                  manifest=MANIFEST_FILE):
+    """
+    This function takes a list of chart specs, the number of worker
+    processes, whether to draw every chart again and the path of the
+    manifest as parameters. It renders every chart whose image is missing
+    or was drawn from a different spec (all of them when force is True),
+    with a process pool or in this process when processes is 1, and
+    returns the filenames of the images it rendered.
+    """
+    done = load_manifest(manifest)
+    keys = {spec['filename']: spec_key(spec) for spec in charts}
+    todo = [spec for spec in charts if force or (
+            done.get(spec['filename']) != keys[spec['filename']]) or (
+            not os.path.exists(spec['filename']))]
+    if processes == 1 or len(todo) <= 1:
+        rendered = [render_chart(spec) for spec in todo]
+    else:
+        with ProcessPoolExecutor(processes) as pool:
+            rendered = list(pool.map(render_chart, todo,
+                                     chunksize=CHUNKSIZE))
+    for filename in rendered:
+        done[filename] = keys[filename]
+    with open(manifest, 'w') as file:
+        json.dump(done, file, indent=1, sort_keys=True)
+    return rendered
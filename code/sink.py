@@ -0,0 +1,96 @@
+'''
+Implements a streaming csv writer for the scrapers. Rows are written to
+disk in small batches as soon as they are scraped, so the memory used by
+a crawl stays the same however many tournaments it goes through. When a
+crawl fails, the rows still buffered are dropped instead of written, and
+a table that is written again from scratch only replaces the old file
+once the crawl has finished.
+'''
+import csv
+import os
+import instrument
+
+BATCH_SIZE = 256
+PART_SUFFIX = '.part'
+
+
+class RowSink:
+    '''
+    Appends rows to a csv file, buffering at most batch_size rows in memory
+    before writing them out (or only on flush when batch_size is None).
+    Can be used as a context manager, which flushes and closes the file at
+    the end, or drops the buffered rows when the block raised.
+    '''
+
+    def __init__(self, filename, header, batch_size=BATCH_SIZE,
+                 append=True):
+        '''
+        Take a filename, the header of the table, the number of rows to
+        buffer and whether to keep the rows already in the file as
+        parameters and open the csv file, writing the header first when the
+        file is new or empty. Without append the rows go to a separate
+        part file, which replaces the csv file when the sink is closed.
+        '''
+        new_file = not append or not os.path.exists(filename) or (
+                   os.path.getsize(filename) == 0)
+        self.filename = filename
+        self.batch_size = batch_size
+        self.rows_written = 0
+        self._buffer = []
+        self._path = filename if append else filename + PART_SUFFIX
+        self._file = open(self._path, 'a' if append else 'w')
+        self._writer = csv.writer(self._file)
+        if new_file:
+            self._writer.writerow(header)
+            self._file.flush()
+
+    def write(self, row):
+        '''
+        Take a row as parameter and add it to the buffer, writing the buffer
+        to disk once it holds batch_size rows.
+        '''
+        self._buffer.append(row)
+        if self.batch_size is not None and (
+           len(self._buffer) >= self.batch_size):
+            self.flush()
+
+    @instrument.timed('write')
+    def flush(self):
+        '''
+        Write every buffered row to disk.
+        '''
+        if self._buffer:
+            self._writer.writerows(self._buffer)
+            self.rows_written += len(self._buffer)
+            self._buffer = []
+        self._file.flush()
+
+    def close(self):
+        '''
+        Flush the remaining rows and close the csv file, moving the part
+        file over the csv file when the sink does not append.
+        '''
+        self.flush()
+        self._file.close()
+        if self._path != self.filename:
+            os.replace(self._path, self.filename)
+
+    def abort(self):
+        '''
+        Drop the buffered rows and close the csv file, leaving the csv file
+        as it was at the last flush, or as it was before the sink opened it
+        when the sink does not append.
+        '''
+        self._buffer = []
+        self._file.close()
+        if self._path != self.filename:
+            os.remove(self._path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
@@ -0,0 +1,228 @@
+"""
+Peter Zhong & Tony Song
+CSE 163 Final Project
+This file implements an embedded SQLite store of the scraped tables. The
+games of the second research question are normalized into a match table
+and a player_game table with one row per player per match, and the
+tables of the third research question into a player_stats table (the
+KDA table) and a roster table (the region table). Player, position and
+region columns are indexed, so the games or statistics of one player are
+found without scanning the whole table. Analyses open the store read
+only, so a mistyped path fails instead of creating an empty store.
+
+Usage: python store.py [directory]
+"""
+
+import os
+import pathlib
+import sqlite3
+import sys
+import pandas as pd
+import tables
+
+SUFFIX = '.db'
+STORE_FILE = 'matches' + SUFFIX
+CHUNKSIZE = 10000
+POSITIONS = ['Top', 'Jun', 'Mid', 'ADC', 'Sup']
+SIDES = ['B', 'R']
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS match (
+    id INTEGER PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS player_game (
+    match_id INTEGER NOT NULL REFERENCES match (id),
+    slot INTEGER NOT NULL,
+    player TEXT NOT NULL,
+    position TEXT NOT NULL,
+    side TEXT NOT NULL,
+    gold REAL,
+    damage REAL
+);
+CREATE TABLE IF NOT EXISTS player_stats (
+    id INTEGER PRIMARY KEY,
+    player TEXT,
+    position TEXT,
+    games INTEGER,
+    win_rate REAL,
+    kda REAL
+);
+CREATE TABLE IF NOT EXISTS roster (
+    id INTEGER PRIMARY KEY,
+    player TEXT,
+    region TEXT
+);
+CREATE INDEX IF NOT EXISTS player_game_player ON player_game (player);
+CREATE INDEX IF NOT EXISTS player_game_position ON player_game (position);
+CREATE INDEX IF NOT EXISTS player_stats_player ON player_stats (player);
+CREATE INDEX IF NOT EXISTS player_stats_position
+    ON player_stats (position);
+CREATE INDEX IF NOT EXISTS roster_player ON roster (player);
+CREATE INDEX IF NOT EXISTS roster_region ON roster (region);
+'''
+
+
+def connect(path=STORE_FILE):
+    """
+    This function takes the path of a store as parameter and returns a
+    connection to it, creating its tables and indexes when they do not
+    exist yet.
+    """
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def open_store(path=STORE_FILE):
+    """
+    This function takes the path of a store as parameter and returns a
+    read-only connection to it. Raises a FileNotFoundError when the store
+    does not exist.
+    """
+    if not os.path.isfile(path):
+        raise FileNotFoundError('no store at ' + path)
+    uri = pathlib.Path(path).resolve().as_uri() + '?mode=ro'
+    return sqlite3.connect(uri, uri=True)
+
+
+def build(path=STORE_FILE, directory='.', chunksize=CHUNKSIZE):
+    """
+    This function takes the path of a store, the directory of the scraped
+    tables and a number of rows as parameters and builds the store again
+    from the tables, reading them chunksize rows at a time.
+    """
+    if os.path.exists(path):
+        os.remove(path)
+    files = dict((table, os.path.join(directory, filename))
+                 for filename, table in tables.FILES)
+    conn = connect(path)
+    with conn:
+        for df in tables.read_table(files['players'], 'players', chunksize):
+            add_games(conn, df)
+        for df in tables.read_table(files['kda'], 'kda', chunksize):
+            conn.executemany(
+                'INSERT INTO player_stats (player, position, games, '
+                'win_rate, kda) VALUES (?, ?, ?, ?, ?)',
+                rows(df, ['Player', 'Position', 'Games', 'Win rate', 'KDA']))
+        for df in tables.read_table(files['region'], 'region', chunksize):
+            conn.executemany('INSERT INTO roster (player, region) '
+                             'VALUES (?, ?)', rows(df, ['Player', 'Region']))
+    conn.close()
+
+
+def rows(df, columns):
+    """
+    This is a helper function for build.
+    It takes a dataframe and a list of its columns as parameters and
+    returns the rows of those columns as tuples of python values, with
+    None for missing values.
+    """
+    values = df[columns].astype(object)
+    values = values.where(values.notna(), None)
+    return [tuple(row) for row in values.itertuples(index=False)]
+
+
+def add_games(conn, df):
+    """
+    This is a helper function for build.
+    It takes a connection and a typed chunk of the gold and damage table
+    as parameters and inserts its matches and the game of every player in
+    them. Slots without a player are left out.
+    """
+    conn.executemany('INSERT INTO match (id) VALUES (?)',
+                     [(int(match),) for match in df.index])
+    for i, position in enumerate(POSITIONS):
+        for j, side in enumerate(SIDES):
+            slot = position + '_' + side
+            games = pd.DataFrame({'match_id': df.index,
+                                  'player': df[slot],
+                                  'gold': df[slot + '_Gold'],
+                                  'damage': df[slot + '_Damage']})
+            games = games[games['player'].notna()]
+            conn.executemany(
+                'INSERT INTO player_game (match_id, slot, player, position, '
+                'side, gold, damage) VALUES (?, %d, ?, ?, ?, ?, ?)' % (
+                    i * len(SIDES) + j),
+                [(match, player, position, side, gold, damage)
+                 for match, player, gold, damage in rows(
+                     games, ['match_id', 'player', 'gold', 'damage'])])
+
+
+def player_names(conn):
+    """
+    This function takes a connection as parameter and returns the names of
+    every player with a game in the store, sorted.
+    """
+    cursor = conn.execute('SELECT DISTINCT player FROM player_game '
+                          'ORDER BY player')
+    return [name for name, in cursor]
+
+
+def player_games(conn, player):
+    """
+    This function takes a connection and the name of a player as
+    parameters and returns a dataframe of that player's games with columns
+    named Player, Match, Gold, Damage, Position and Side, ordered by
+    position, then side, then match like stack_players in algorithm.py.
+    Games with a missing gold or damage are left out.
+    """
+    return pd.read_sql_query(
+        'SELECT player AS Player, match_id AS Match, gold AS Gold, '
+        'damage AS Damage, position AS Position, side AS Side '
+        'FROM player_game '
+        'WHERE player = ? AND gold IS NOT NULL AND damage IS NOT NULL '
+        'ORDER BY slot, match_id', conn, params=(player,))
+
+
+def read_table(path, table, chunksize=None):
+    """
+    This function takes the path of a store, the name of a table ('kda' or
+    'region') and a number of rows as parameters and returns that table in
+    the same typed columns as tables.read_table, as a list of one
+    dataframe or as an iterator over dataframes of at most chunksize rows.
+    The rows of every chunk keep their row number in the table as index.
+    """
+    queries = {'kda': 'SELECT player AS Player, position AS Position, '
+                      'games AS Games, win_rate AS "Win rate", kda AS KDA '
+                      'FROM player_stats ORDER BY id',
+               'region': 'SELECT player AS Player, region AS Region '
+                         'FROM roster ORDER BY id'}
+    if table not in queries:
+        raise ValueError('the store has no ' + table + ' table')
+    conn = open_store(path)
+    if chunksize is None:
+        df = pd.read_sql_query(queries[table], conn)
+        conn.close()
+        return [tables.typed(df, table)]
+    return _chunks(conn, queries[table], table, chunksize)
+
+
+def _chunks(conn, query, table, chunksize):
+    """
+    This is a helper function for read_table.
+    It takes a connection, a query, the name of a table and a number of
+    rows as parameters and yields the typed rows of the query in
+    dataframes of at most chunksize rows, closing the connection at the
+    end.
+    """
+    start = 0
+    try:
+        for df in pd.read_sql_query(query, conn, chunksize=chunksize):
+            df.index = pd.RangeIndex(start, start + len(df.index))
+            start += len(df.index)
+            yield tables.typed(df, table)
+    finally:
+        conn.close()
+
+
+def main():
+    directory = sys.argv[1] if len(sys.argv) > 1 else '.'
+    build(STORE_FILE, directory)
+    conn = open_store(STORE_FILE)
+    for table in ['match', 'player_game', 'player_stats', 'roster']:
+        count, = conn.execute('SELECT COUNT(*) FROM ' + table).fetchone()
+        print('%-12s %8d rows' % (table, count))
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+'''
+Generates synthetic versions of the four tables of the project at any
+scale, to test and benchmark algorithm.py beyond the size of the scraped
+data. Every table has the same columns and value formats as the scraped
+csv files. A seeded random generator makes the same arguments always
+give the same files, and the rows are written in chunks so the memory
+used does not grow with the number of matches.
+
+Usage: python synthetic.py [--matches N] [--players N]
+                           [--tournaments N] [--seed N] [directory]
+'''
+import argparse
+import os
+import numpy as np
+import pandas as pd
+import tables
+
+POSITIONS = ['Top', 'Jun', 'Mid', 'ADC', 'Sup']
+ROLES = ['TOP', 'JUNGLE', 'MID', 'ADC', 'SUPPORT']
+SIDES = ['B', 'R']
+REGIONS = ['CN', 'KR', 'EUW', 'NA', 'TW', 'VN']
+OBJECTIVES = ['Herald', 'Dragon', 'Elder_Dragon', 'Baron']
+MEAN_OBJECTIVES = [1.0, 2.5, 0.2, 0.8]
+CHUNKSIZE = 100000
+
+
+class Roster:
+    '''
+    The synthetic players: every player has a position, a region, a mean
+    damage per gold and a skill deciding how often their team wins.
+    '''
+
+    def __init__(self, players, rng):
+        self.names = np.array(['Player%d' % i for i in range(players)],
+                              dtype=object)
+        self.position = np.arange(players) % len(POSITIONS)
+        self.region = rng.integers(len(REGIONS), size=players)
+        self.ratio = rng.normal(1.0, 0.25, players).clip(0.3)
+        self.skill = rng.normal(0.0, 1.0, players)
+
+    def pick(self, rng, size):
+        '''
+        Take a random generator and a number of matches as parameters and
+        return an array of shape (size, 10) with the players of each match
+        in slot order (every position of the blue side, then of the red
+        side), no player showing up twice in a match.
+        '''
+        slots = np.empty((size, len(SIDES) * len(POSITIONS)), dtype=int)
+        for i in range(len(POSITIONS)):
+            candidates = np.flatnonzero(self.position == i)
+            blue = rng.integers(len(candidates), size=size)
+            red = (blue + rng.integers(1, len(candidates), size=size)) % (
+                  len(candidates))
+            slots[:, i] = candidates[blue]
+            slots[:, len(POSITIONS) + i] = candidates[red]
+        return slots
+
+
+def objectives_chunk(rng, size):
+    '''
+    Take a random generator and a number of matches as parameters and
+    return a dataframe of that many rows of the objectives table, the
+    winning side getting more of every objective on average.
+    '''
+    blue_wins = rng.random(size) < 0.53
+    table = {}
+    for side in SIDES:
+        won = blue_wins if side == 'B' else ~blue_wins
+        for objective, mean in zip(OBJECTIVES, MEAN_OBJECTIVES):
+            table[objective + '_' + side] = rng.poisson(
+                np.where(won, mean * 1.4, mean * 0.6))
+    table['Win_B'] = blue_wins.astype(int)
+    table['Win_R'] = (~blue_wins).astype(int)
+    return pd.DataFrame(table)[tables.OBJECTIVE_COLUMNS]
+
+
+def players_chunk(rng, roster, size):
+    '''
+    Take a random generator, a roster and a number of matches as
+    parameters and return a dataframe of that many rows of the gold and
+    damage table.
+    '''
+    slots = roster.pick(rng, size)
+    gold = rng.normal(12000, 2500, slots.shape).clip(3000).round()
+    damage = (gold * rng.normal(roster.ratio[slots], 0.2)).clip(0).round()
+    names = [position + '_' + side for side in SIDES
+             for position in POSITIONS]
+    table = {}
+    for i, name in enumerate(names):
+        table[name] = roster.names[slots[:, i]]
+    for i, name in enumerate(names):
+        table[name + '_Gold'] = gold[:, i]
+    for i, name in enumerate(names):
+        table[name + '_Damage'] = damage[:, i]
+    return pd.DataFrame(table)
+
+
+def kda_and_region(rng, roster, tournaments):
+    '''
+    Take a random generator, a roster and a number of tournaments as
+    parameters and return the KDA table and the region table, with one
+    row for every player in every tournament they played.
+    '''
+    played = rng.random((tournaments, len(roster.names))) < 0.6
+    _, players = np.nonzero(played)
+    games = rng.integers(1, 25, size=len(players))
+    win_rate = 1 / (1 + np.exp(-roster.skill[players] + rng.normal(
+               0, 0.5, len(players))))
+    kda = (roster.skill[players] + 3 + rng.normal(0, 1, len(players)))
+    kda = np.char.mod('%.1f', kda.clip(0.1)).astype(object)
+    kda[rng.random(len(players)) < 0.02] = '-'
+    names = roster.names[players]
+    kda_table = pd.DataFrame({
+        'Player': names,
+        'Position': np.array(ROLES)[roster.position[players]],
+        'Games': games,
+        'Win rate': np.char.mod('%.1f%%', 100 * win_rate),
+        'KDA': kda})
+    region_table = pd.DataFrame({
+        'Player': names,
+        'Region': np.array(REGIONS)[roster.region[players]]})
+    return kda_table, region_table
+
+
+def generate(directory='.', matches=10000, players=500, tournaments=20,
+             seed=0, chunksize=CHUNKSIZE):
+    '''
+    Take a directory, the number of matches, players and tournaments, a
+    seed and a number of rows as parameters and write the four synthetic
+    tables into the directory under their usual file names, generating
+    the matches chunksize rows at a time.
+    '''
+    os.makedirs(directory, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    roster = Roster(max(players, 2 * len(POSITIONS)), rng)
+    files = dict((table, os.path.join(directory, filename))
+                 for filename, table in tables.FILES)
+    for start in range(0, matches, chunksize):
+        size = min(chunksize, matches - start)
+        mode = 'w' if start == 0 else 'a'
+        objectives_chunk(rng, size).to_csv(files['objectives'], mode=mode,
+                                           header=start == 0, index=False)
+        players_chunk(rng, roster, size).to_csv(files['players'], mode=mode,
+                                                header=start == 0,
+                                                index=False)
+    kda_table, region_table = kda_and_region(rng, roster, tournaments)
+    kda_table.to_csv(files['kda'], index=False)
+    region_table.to_csv(files['region'], index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('directory', nargs='?', default='.')
+    parser.add_argument('--matches', type=int, default=10000)
+    parser.add_argument('--players', type=int, default=500)
+    parser.add_argument('--tournaments', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    generate(args.directory, args.matches, args.players, args.tournaments,
+             args.seed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,191 @@
+'''
+Implements the typed columnar storage of the four scraped tables. The
+scrapers still stream their rows to csv files, which are kept as the
+export format, and store every finished table again as a Parquet file
+with categorical player, position and region columns, numeric gold,
+damage and KDA columns and the win rate as a fraction. The analyses read
+a table through read_table, which uses the Parquet file when it is up to
+date and otherwise parses the csv file into the same typed columns.
+Every table follows a compact schema: counts are downcast to the
+smallest integer type that holds them and gold and damage are float32.
+Win rates and KDAs stay float64, since they are added into PT-scores
+whose ties decide the All-Star teams. Running this file reports the
+memory footprint of every table before and after.
+
+Usage: python tables.py [directory]
+'''
+import os
+import sys
+import pandas as pd
+import instrument
+
+SUFFIX = '.parquet'
+COMPRESSION = 'zstd'
+SLOTS = [position + '_' + side for side in ['B', 'R']
+         for position in ['Top', 'Jun', 'Mid', 'ADC', 'Sup']]
+CSV_OPTIONS = {'objectives': {},
+               'players': {},
+               'kda': {'na_values': '-'},
+               'region': {'keep_default_na': False, 'na_values': ['']}}
+OBJECTIVE_COLUMNS = [objective + '_' + side for side in ['B', 'R']
+                     for objective in ['Herald', 'Dragon', 'Elder_Dragon',
+                                       'Baron']] + ['Win_B', 'Win_R']
+CATEGORIES = {'objectives': [],
+              'players': SLOTS,
+              'kda': ['Player', 'Position'],
+              'region': ['Player', 'Region']}
+NUMBERS = {'objectives': dict.fromkeys(OBJECTIVE_COLUMNS, 'integer'),
+           'players': dict.fromkeys([slot + '_' + value for value in [
+                                     'Gold', 'Damage'] for slot in SLOTS],
+                                    'float32'),
+           'kda': {'Games': 'integer', 'Win rate': 'float64',
+                   'KDA': 'float64'},
+           'region': {}}
+# Misspelled columns written by older versions of the scrapers
+RENAMED = {'_Danmage': '_Damage'}
+FILES = [('Matches_Objectives.csv', 'objectives'),
+         ('Players_Gold_And_Damage.csv', 'players'),
+         ('Players_KDA_And_Winrate.csv', 'kda'),
+         ('Players_Region.csv', 'region')]
+
+
+def typed(df, table):
+    '''
+    Take a dataframe read from the csv file of a table and the name of the
+    table ('objectives', 'players', 'kda' or 'region') as parameters and
+    return the dataframe with the typed, compact columns of that table.
+    Integer columns holding missing values become float32. Columns with an
+    old misspelled name are renamed, and a ValueError is raised when a
+    column of the table is missing.
+    '''
+    df = df.rename(columns=dict(
+        (column, column.replace(old, new)) for column in df.columns
+        for old, new in RENAMED.items() if column.endswith(old)))
+    missing = [column for column in CATEGORIES[table] + list(NUMBERS[table])
+               if column not in df.columns]
+    if missing:
+        raise ValueError('the %s table has no %s column' % (
+                         table, ', '.join(missing)))
+    if table == 'kda':
+        if not pd.api.types.is_numeric_dtype(df['Win rate']):
+            df['Win rate'] = pd.to_numeric(
+                df['Win rate'].str.rstrip('%')) / 100
+    for column in CATEGORIES[table]:
+        df[column] = df[column].astype('category')
+    for column, kind in NUMBERS[table].items():
+        if kind == 'integer':
+            df[column] = pd.to_numeric(df[column], downcast='integer')
+            if pd.api.types.is_integer_dtype(df[column]):
+                continue
+            kind = 'float32'
+        df[column] = df[column].astype(kind)
+    return df
+
+
+def table_path(path):
+    '''
+    Take the path of a csv file as parameter and return the path of its
+    Parquet file.
+    '''
+    return os.path.splitext(path)[0] + SUFFIX
+
+
+def source(path):
+    '''
+    Take the path of a table as parameter and return the path of the
+    Parquet file of that table when it exists and is at least as new as
+    the csv file, or the path itself otherwise.
+    '''
+    if path.endswith(SUFFIX):
+        return path
+    parquet = table_path(path)
+    if os.path.exists(parquet) and (not os.path.exists(path) or (
+       os.path.getmtime(parquet) >= os.path.getmtime(path))):
+        return parquet
+    return path
+
+
+def read_table(path, table, chunksize=None):
+    '''
+    Take the path of a table, the name of the table and a number of rows
+    as parameters and return the typed table as a list of one dataframe,
+    or as an iterator over dataframes of at most chunksize rows when
+    chunksize is given. The rows of every chunk keep their row number in
+    the whole table as index. The KDA and region tables can also be read
+    from a SQLite store (see store.py).
+    '''
+    if path.endswith('.db'):
+        import store
+        return store.read_table(path, table, chunksize)
+    path = source(path)
+    if path.endswith(SUFFIX):
+        if chunksize is None:
+            return [pd.read_parquet(path)]
+        return _parquet_chunks(path, chunksize)
+    options = CSV_OPTIONS[table]
+    if chunksize is None:
+        return [typed(pd.read_csv(path, **options), table)]
+    return (typed(df, table) for df in pd.read_csv(
+            path, chunksize=chunksize, **options))
+
+
+def _parquet_chunks(path, chunksize):
+    '''
+    Take the path of a Parquet file and a number of rows as parameters and
+    yield its rows as dataframes of at most chunksize rows.
+    '''
+    import pyarrow.parquet as pq
+    start = 0
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+        df = batch.to_pandas()
+        df.index = pd.RangeIndex(start, start + len(df.index))
+        start += len(df.index)
+        yield df
+
+
+@instrument.timed('store')
+def store(path, table):
+    '''
+    Take the path of the csv file of a table and the name of the table as
+    parameters and store the typed table in its Parquet file.
+    '''
+    df = typed(pd.read_csv(path, **CSV_OPTIONS[table]), table)
+    df.to_parquet(table_path(path), index=False, compression=COMPRESSION)
+
+
+def footprint(df):
+    '''
+    Take a dataframe as parameter and return the number of bytes it takes
+    in memory, including the strings it holds.
+    '''
+    return int(df.memory_usage(deep=True).sum())
+
+
+def memory_report(files=FILES):
+    '''
+    Take a list of tuples of the path of a csv file and the name of its
+    table as parameters and return a dataframe with the number of rows of
+    every table and the bytes it takes in memory when read as plain csv
+    and when read with the compact schema.
+    '''
+    rows = []
+    for path, table in files:
+        raw = pd.read_csv(path, **CSV_OPTIONS[table])
+        compact = pd.concat(read_table(path, table))
+        rows.append([table, len(raw.index), footprint(raw),
+                     footprint(compact)])
+    report = pd.DataFrame(rows, columns=['Table', 'Rows', 'Raw bytes',
+                                         'Compact bytes'])
+    report['Saved'] = 1 - report['Compact bytes'] / report['Raw bytes']
+    return report
+
+
+def main():
+    directory = sys.argv[1] if len(sys.argv) > 1 else '.'
+    files = [(os.path.join(directory, path), table)
+             for path, table in FILES]
+    print(memory_report(files).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,147 +1,286 @@
 import pandas as pd
+import numpy as np
+from pandas.api.types import union_categoricals
+from accumulate import WINDOW, AllStarStats, PlayerStats
+from accumulate import load_rolling, save_rolling
+import bootstrap
+import store
+import tables
 
+OBJECTIVES = ['Dragon', 'Elder_Dragon', 'Herald', 'Baron']
+POSITIONS = ['Top', 'Jun', 'Mid', 'ADC', 'Sup']
+SIDES = ['B', 'R']
 
-def objective_score(filepath):
+
+def objective_score(filepath, objectives=OBJECTIVES, chunksize=None):
     """
-    This fucntion gives solutions to the first research question.
-    It takes a filepath as parameter and calculates and plots the
-    objective scores of each of the four neutral objectives in
-    League of Legends.
+    This function gives solutions to the first research question.
+    It takes a filepath, a list of objectives and a number of rows as
+    parameters and calculates the objective scores of each of the given
+    neutral objectives in League of Legends (by default all four of them).
+    When chunksize is given the file is read that many matches at a time.
     """
-    # Load in file
-    df = pd.read_csv(filepath)
-    num_matches = len(df.index)
-    df_b = df[df['Win_B'] == 1]
-    df_r = df[df['Win_R'] == 1]
+    # Load in file and calculate objective scores
+    totals = np.zeros(len(objectives))
+    num_matches = 0
+    for df in tables.read_table(filepath, 'objectives', chunksize):
+        totals += objective_totals(df, objectives)
+        num_matches += len(df.index)
+    return (totals / num_matches).tolist()
 
-    # Calculate objective scores
-    dragon_score = get_score(df_b, df_r, 'Dragon') / num_matches
-    elder_score = get_score(df_b, df_r, 'Elder_Dragon') / num_matches
-    herald_score = get_score(df_b, df_r, 'Herald') / num_matches
-    baron_score = get_score(df_b, df_r, 'Baron') / num_matches
 
-    return[dragon_score, elder_score, herald_score, baron_score]
+def objective_totals(df, objectives):
+    """
+    This is a helper function for objective_score.
+    This function takes a dataframe and a list of objectives as parameters
+    and sums, for every objective, the winner's objectives minus the
+    loser's over all the games in one pass, using a sign of 1 when blue
+    wins and -1 when red wins. Dividing by the number of games gives the
+    objective scores.
+    """
+    blue, red, sign = objective_sides(df, objectives)
+    return sign @ (blue - red)
 
 
-def get_score(df_b, df_r, obj):
+def objective_margins(df, objectives):
     """
-    This is a helper function for objective_score.
-    This fucntion takes two dataframe and name of the objective as parameters
-    and calculate the total obkective score of that objective over all the
-    games in the database.
+    This is a helper function for objective_intervals.
+    This function takes a dataframe and a list of objectives as parameters
+    and returns a (games x objectives) array with the winner's objectives
+    minus the loser's in every game, whose column means are the objective
+    scores.
     """
-    score_b = df_b[obj + '_B'].sum() - df_b[obj + '_R'].sum()
-    score_r = df_r[obj + '_R'].sum() - df_r[obj + '_B'].sum()
-    score = score_b + score_r
-    return score
+    blue, red, sign = objective_sides(df, objectives)
+    return sign[:, np.newaxis] * (blue - red)
 
 
-def consistent_player(filepath):
+def objective_sides(df, objectives):
+    """
+    This is a helper function for objective_totals and objective_margins.
+    This function takes a dataframe and a list of objectives as parameters
+    and returns the arrays of blue side's and red side's objectives in
+    every game (missing ones counted as 0) and the array of signs, 1 when
+    blue wins and -1 when red wins.
+    """
+    blue = df[[obj + '_B' for obj in objectives]].fillna(0).to_numpy(float)
+    red = df[[obj + '_R' for obj in objectives]].fillna(0).to_numpy(float)
+    sign = (df['Win_B'] == 1).to_numpy(float) - (
+            df['Win_R'] == 1).to_numpy(float)
+    return blue, red, sign
+
+
+def objective_intervals(filepath, objectives=OBJECTIVES,
+                        resamples=bootstrap.RESAMPLES,
+                        confidence=bootstrap.CONFIDENCE, seed=0,
+                        chunksize=None, processes=None):
+    """
+    This function takes a filepath, a list of objectives, the number of
+    bootstrap resamples, the confidence level, a seed, a number of rows
+    and the number of worker processes as parameters and returns a
+    dataframe indexed by objective with the objective score and the lower
+    and upper bounds of its bootstrap confidence interval (see
+    bootstrap.py). The same seed always gives the same intervals.
+    """
+    margins = np.concatenate([objective_margins(df, objectives) for df in
+                              tables.read_table(filepath, 'objectives',
+                                                chunksize)])
+    lower, upper = bootstrap.intervals(margins, resamples, confidence, seed,
+                                       processes)
+    return pd.DataFrame({'Objective Score': margins.mean(axis=0),
+                         'Lower': lower, 'Upper': upper},
+                        index=pd.Index(objectives, name='Objective'))
+
+
+def consistent_player(filepath, chunksize=None):
     """
     This fucntion gives solutions to the second research question.
-    It takes a filepath as parameter and calculates and plots the
-    damage per gold ratio for the top 10 most consistent players.
-    It also plots the performance over time plot for the three most
-    consistent players.
-    """
-    # Reading in the data
-    df = pd.read_csv(filepath)
-    top_laners = group_by_position(df, 'Top')
-    junglers = group_by_position(df, 'Jun')
-    mid_laners = group_by_position(df, 'Mid')
-    adcs = group_by_position(df, 'ADC')
-    supports = group_by_position(df, 'Sup')
-    players = top_laners.append([junglers, mid_laners, adcs, supports])
-
-    # Calculating variance for each player
-    df2 = players.copy()
-    df2['Dmg_Per_Gold'] = df2['Damage'] / df2['Gold']
-    variance = df2.groupby('Player')['Dmg_Per_Gold'].var()
-    df_var = pd.DataFrame({'Player': variance.index,
-                          'Variance': variance.values})
-    df_var = df_var.set_index('Player')
-
-    # Removing players with less than 30 games and with high variacne
-    df3 = players.copy()
-    df3['Number_of_Games'] = 1
-    df3 = df3.groupby('Player')[['Gold', 'Damage', 'Number_of_Games']].sum()
-    df3['Variance'] = df_var['Variance']
+    It takes a filepath and a number of rows as parameters and calculates
+    and plots the damage per gold ratio for the top 10 most consistent
+    players. It also plots the performance over time plot for the three
+    most consistent players. When chunksize is given the file is read that
+    many matches at a time.
+    """
+    # Reading in the data and calculating games, gold, damage and
+    # variance for each player
+    stats = PlayerStats()
+    for df in tables.read_table(filepath, 'players', chunksize):
+        stats.add(stack_players(df))
+    df3 = stats.result()
 
     # Calculating overall most consistent player
     df4 = df3.copy()
-    df4['Dmg_Per_Gold'] = df4['Damage'] / df4['Gold']
+    df4['Dmg_Per_Gold'] = df4['Damage'].astype('float64') / df4['Gold']
     df4 = df4.sort_values(by=['Dmg_Per_Gold'], ascending=False)
 
     result = df4.head(3).index.tolist()
     return result
 
 
-def group_by_position(df, position):
+def performance_report(filepath, players=None, chunksize=None):
+    """
+    This function takes a filepath, a list of players (all of them when
+    None) and a number of rows as parameters and returns a dictionary from
+    every chosen player to the damage per gold of each game that player
+    has played. When chunksize is given the file is read that many matches
+    at a time. The filepath can also be a SQLite store (see store.py),
+    whose games are looked up player by player.
+    """
+    if filepath.endswith(store.SUFFIX):
+        return store_performance(filepath, players)
+    games = []
+    for df in tables.read_table(filepath, 'players', chunksize):
+        players_df = stack_players(df)
+        if players is not None:
+            players_df = players_df[players_df['Player'].isin(players)]
+        games.append(players_df)
+    df2 = pd.concat(games).sort_values(by=['Position', 'Side'],
+                                       kind='stable')
+    df2['Dmg_Per_Gold'] = df2['Damage'].astype('float64') / df2['Gold']
+    return player_performance(df2, players)
+
+
+def store_performance(path, players=None):
+    """
+    This is a helper function for performance_report.
+    It takes the path of a SQLite store and a list of players (all of them
+    when None) as parameters and returns a dictionary from every chosen
+    player, sorted by name, to a series of that player's damage per gold in
+    game order, looking up the games of each player through its index.
+    """
+    conn = store.open_store(path)
+    if players is None:
+        players = store.player_names(conn)
+    report = {}
+    for player in sorted(players):
+        games = store.player_games(conn, player)
+        if len(games.index) > 0:
+            report[player] = games['Damage'] / games['Gold']
+    conn.close()
+    return report
+
+
+def player_performance(df, players=None):
+    """
+    This is a helper function for performance_report.
+    It takes a dataframe of stacked games with a Dmg_Per_Gold column and a
+    list of players (all of them when None) as parameters and returns a
+    dictionary from every chosen player, sorted by name, to a series of
+    that player's damage per gold in game order. The rows of every player
+    are found by grouping the games once instead of scanning them once per
+    player.
+    """
+    rows = df.groupby('Player', observed=True).indices
+    if players is not None:
+        rows = {player: rows[player] for player in players if player in rows}
+    ratios = df['Dmg_Per_Gold']
+    return {player: ratios.iloc[rows[player]] for player in sorted(rows)}
+
+
+def stack_players(df):
     """
     This is a helper function for consistent_player.
-    This function takes a dataframe and a LOL position as parameters
-    and group all the players within that position. It returns a new
-    dataframe with columns named Player, Gold and Damage.
+    This function takes a dataframe with one row per match as parameter
+    and stacks the player, gold and damage columns of all 10 players into
+    one long dataframe with columns named Player, Match (the row of the
+    match in its table), Gold, Damage, Position and Side, ordered by
+    position, then side, then match. Player, Position and Side are
+    categorical columns and Gold and Damage are float32. The player
+    columns are stacked by merging their categories, without hashing
+    every name again. Rows with missing values are dropped.
+    """
+    slots = [position + '_' + side for position in POSITIONS
+             for side in SIDES]
+    num_matches = len(df.index)
+    position = np.repeat(np.arange(len(POSITIONS)), len(SIDES) * num_matches)
+    side = np.tile(np.repeat(np.arange(len(SIDES)), num_matches),
+                   len(POSITIONS))
+    names = [df[slot].astype('category') for slot in slots]
+    names = [name.cat.set_categories(name.cat.categories.astype('str'))
+             for name in names]
+    players = pd.DataFrame({
+        'Player': union_categoricals(names),
+        'Match': np.tile(df.index.to_numpy(), len(slots)),
+        'Gold': df[[slot + '_Gold' for slot in slots]].to_numpy(
+            'float32').ravel(order='F'),
+        'Damage': df[[slot + '_Damage' for slot in slots]].to_numpy(
+            'float32').ravel(order='F'),
+        'Position': pd.Categorical.from_codes(position, POSITIONS),
+        'Side': pd.Categorical.from_codes(side, SIDES)})
+    return players.dropna().reset_index(drop=True)
+
+
+def rolling_form(filepath, players=None, window=WINDOW, chunksize=None,
+                 state_file=None):
+    """
+    This function takes a filepath, a list of players (all of them when
+    None), the number of games in a window, a number of rows and the path
+    of a state file as parameters. It returns a dataframe with the damage
+    per gold of every game of the chosen players in match order and its
+    rolling mean and variance over the player's last window games (see
+    RollingStats). When chunksize is given the file is read that many
+    matches at a time and every chunk only adds the windows ending in its
+    games. When state_file is given the windows are saved in it, and a
+    later run only adds the matches appended to the file since (see
+    load_rolling).
     """
-    df1 = df[[position + '_B', position + '_B_Gold', position + '_B_Damage']]
-    df1 = df1.rename(columns={position + '_B': 'Player',
-                     position + '_B_Gold': 'Gold',
-                     position + '_B_Damage': 'Damage'})
-    df2 = df[[position + '_R', position + '_R_Gold', position + '_R_Damage']]
-    df2 = df2.rename(columns={position + '_R': 'Player',
-                     position + '_R_Gold': 'Gold',
-                     position + '_R_Damage': 'Damage'})
-    df = df1.append(df2).dropna()
-    return df
+    stats, covered = load_rolling(state_file, filepath, window, players)
+    rows = covered
+    for df in tables.read_table(filepath, 'players', chunksize):
+        df = df[df.index >= covered]
+        if df.empty:
+            continue
+        games = stack_players(df)
+        if players is not None:
+            games = games[games['Player'].isin(players)]
+        stats.add(games)
+        rows += len(df.index)
+    if state_file is not None:
+        save_rolling(state_file, filepath, stats, rows, players)
+    return stats.result()
 
 
-def all_star(kda_file, region_file):
+def all_star(kda_file, region_file, chunksize=None):
     """
     This fucntion gives solutions to the third research question.
     It takes two filepath (one containing player information, one containing
-    region information) as parameters and calculates the best player in each
-    position according to PT-score and plots the PT-score of players. It also
-    plots the cumulative scores for the All-Star teams from each region.
+    region information) and a number of rows as parameters and calculates
+    the best player in each position according to PT-score and plots the
+    PT-score of players. It also plots the cumulative scores for the
+    All-Star teams from each region. When chunksize is given the files are
+    read that many rows at a time.
     """
     # Loading and joining files
-    df = pd.read_csv(kda_file, na_values='-').set_index('Player')
-    df2 = pd.read_csv(region_file).set_index('Player').dropna()
-    df = df.join(df2)
-    df['KDA'] = df['KDA'].astype(float)
-    df['Win rate'] = df['Win rate'].map(lambda x: x.rstrip('%')).astype(float)
-    df['Win rate'] = df['Win rate'] / 100
-
-    # Constructing dataframes of all-star teams
-    A = get_regional_data(df, 'A')
-    B = get_regional_data(df, 'B')
-    C = get_regional_data(df, 'C')
-    D = get_regional_data(df, 'D')
-    E = get_regional_data(df, 'E')
-    F = get_regional_data(df, 'F')
+    stats = AllStarStats()
+    for df in tables.read_table(kda_file, 'kda', chunksize):
+        stats.add_kda(df)
+    for df in tables.read_table(region_file, 'region', chunksize):
+        stats.add_regions(df)
+    df = stats.result()
+
+    # Constructing the all-star teams of every region in the data
+    regions = all_star_teams(df)
 
     # rank all the regions
-    regions = A.append([B, C, D, E, F])
     result = rank_region(regions)
     return result
 
 
-def get_regional_data(df, region):
+def all_star_teams(df):
     """
     This is a helper function for all_star.
-    It takes a dataframe and the string representing a region as parameters
-    and returns a new dataframe containing the 5 best player from each region
-    determined by calculating the PT-rating of each player.
-    """
-    df2 = df.copy()
-    df2 = df2[df2['Region'] == region]
-    df2['Games'] = df2.groupby('Player')['Games'].sum()
-    df2 = df2[df2['Games'] >= 15]
-    df2['KDA'] = df2.groupby('Player')['KDA'].mean()
-    df2['Win rate'] = df2.groupby('Player')['Win rate'].mean()
-    df2 = df2.drop_duplicates()
-    df2['PT-score'] = df2['KDA'] + df2['Win rate']
-    best_team = df2.groupby('Position')['PT-score'].idxmax()
-    mask = df2.index.isin(best_team.values)
+    It takes a dataframe of the games, win rates and KDAs of every player
+    (see AllStarStats) as parameter and returns a new dataframe containing
+    the 5 best player from every region found in the data, determined by
+    calculating the PT-rating of each player. All the regions are built in
+    one grouped pass instead of one pass per region.
+    """
+    df2 = df[df['Games'] >= 15].drop_duplicates()
+    df2 = df2.assign(**{'PT-score': df2['KDA'] + df2['Win rate']})
+    best_team = df2.groupby(['Region', 'Position'], observed=True)[
+        'PT-score'].idxmax()
+    best = pd.MultiIndex.from_arrays([
+        best_team.index.get_level_values('Region'), best_team.values])
+    mask = pd.MultiIndex.from_arrays([df2['Region'], df2.index]).isin(best)
     df2 = df2[mask]
     return df2
 
@@ -149,7 +288,7 @@ def get_regional_data(df, region):
 def rank_region(regions):
     """
     This is a helper function for all_star.
-    It takes a list of dataframes representing different regions. It
+    It takes a dataframe of the All-Star teams of different regions. It
     sorts them according to their cumulative PT-score and plots the
     cumulative PT-score of each team.
     """
@@ -5,10 +5,38 @@ This file implements all the testing functions for
 algorithm.py.
 """
 
+from contextlib import contextmanager, redirect_stdout
+import io
+import os
+import shutil
+import tempfile
+import time
+import numpy as np
 import pandas as pd
+import requests
+import bootstrap
+import cli
+import data_1_and_2
+import data_3
+import fake_golgg
+import fetch
+import instrument
+import memo
+import render
+import store
+import synthetic
+import tables
+import test_algorithm
+import throttle
+from accumulate import PlayerStats, RollingStats
+from cache import PageCache
 from test_algorithm import objective_score
+from test_algorithm import objective_intervals
 from test_algorithm import consistent_player
 from test_algorithm import all_star
+from test_algorithm import stack_players
+from test_algorithm import performance_report
+from test_algorithm import rolling_form
 
 
 def process_file(filename):
@@ -34,6 +62,21 @@ def test_objective_score():
         print(result)
 
 
+def test_objective_subset():
+    """
+    prints 'Objective Subset Passed' if the objective_score method
+    result for a chosen list of objectives matches the correct result.
+    prints 'Error in Objective Subset' otherwise.
+    """
+    result = objective_score('Test_Matches_Objectives.csv',
+                             ['Baron', 'Dragon'])
+    if result == [0.6, 0.3]:
+        print('Objective Subset Passed')
+    else:
+        print('Error in Objective Subset')
+        print(result)
+
+
 def test_consistent_player():
     """
     prints 'Consistent Player Passed' if the consistent_player method
@@ -48,6 +91,55 @@ def test_consistent_player():
         print(result)
 
 
+def test_player_stats_merge():
+    """
+    prints 'Player Stats Merge Passed' if merging the PlayerStats of two
+    halves of the games gives the same statistics as pandas computes
+    over all of them. prints 'Error in Player Stats Merge' otherwise.
+    """
+    players = stack_players(pd.read_csv('Players_Gold_And_Damage.csv'))
+    first = PlayerStats()
+    first.add(players.iloc[:len(players.index) // 2])
+    second = PlayerStats()
+    second.add(players.iloc[len(players.index) // 2:])
+    first.merge(second)
+    result = first.result()
+    ratio = players['Damage'].astype(float) / players['Gold']
+    variance = ratio.groupby(players['Player']).var().reindex(result.index)
+    games = players.groupby('Player').size().reindex(result.index)
+    if np.allclose(result['Variance'], variance, equal_nan=True) and (
+       (result['Number_of_Games'] == games).all()):
+        print('Player Stats Merge Passed')
+    else:
+        print('Error in Player Stats Merge')
+        print(result)
+
+
+def test_performance_report():
+    """
+    prints 'Performance Report Passed' if the performance_report method
+    gives every player the same damage per gold series as filtering the
+    stacked games by that player, for all players and for a subset read in
+    chunks. prints 'Error in Performance Report' otherwise.
+    """
+    players = stack_players(pd.read_csv('Players_Gold_And_Damage.csv'))
+    players['Dmg_Per_Gold'] = players['Damage'].astype(float) / (
+                              players['Gold'])
+    report = performance_report('Players_Gold_And_Damage.csv')
+    subset = performance_report('Players_Gold_And_Damage.csv',
+                                ['Uzi', 'Bang'], 7)
+    passed = sorted(report) == sorted(players['Player'].unique()) and (
+             list(subset) == ['Bang', 'Uzi'])
+    for player, ratios in list(report.items()) + list(subset.items()):
+        games = players[players['Player'] == player]['Dmg_Per_Gold']
+        passed = passed and np.array_equal(ratios.to_numpy(),
+                                           games.to_numpy(), equal_nan=True)
+    if passed:
+        print('Performance Report Passed')
+    else:
+        print('Error in Performance Report')
+
+
 def test_all_star():
     """
     prints 'All Star Passed' if the all_star method result
@@ -63,13 +155,678 @@ def test_all_star():
         print(result)
 
 
+def test_chunked():
+    """
+    prints 'Chunked Passed' if reading the files a few rows at a time
+    gives the same results as reading them all at once. prints 'Error in
+    Chunked' otherwise.
+    """
+    scores = objective_score('Matches_Objectives.csv')
+    chunked = objective_score('Matches_Objectives.csv', chunksize=7)
+    players = consistent_player('Players_Gold_And_Damage.csv')
+    chunked_players = consistent_player('Players_Gold_And_Damage.csv', 7)
+    regions = all_star('Test_Players_KDA_And_Winrate.csv',
+                       'Test_Players_Region.csv', 4)
+    if np.allclose(scores, chunked) and players == chunked_players and (
+       regions == ['A', 'B', 'C', 'D', 'E', 'F']):
+        print('Chunked Passed')
+    else:
+        print('Error in Chunked')
+        print(chunked, chunked_players, regions)
+
+
+def test_render_charts():
+    """
+    prints 'Render Charts Passed' if render_charts draws a new chart once
+    and skips it while its image is up to date. prints 'Error in Render
+    Charts' otherwise.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, 'chart.jpg')
+        manifest = os.path.join(directory, 'plots.json')
+        spec = render.chart(filename, 'bar', [1, 2], ['A', 'B'], 'Test')
+        first = render.render_charts([spec], 1, manifest=manifest)
+        second = render.render_charts([spec], 1, manifest=manifest)
+        spec['title'] = 'Changed'
+        third = render.render_charts([spec], 1, manifest=manifest)
+    if first == [filename] and second == [] and third == [filename]:
+        print('Render Charts Passed')
+    else:
+        print('Error in Render Charts')
+        print(first, second, third)
+
+
+def test_memo_cached():
+    """
+    prints 'Memo Cached Passed' if a memoized objective score is computed
+    once, served from the cache with its charts while its file and
+    parameters are unchanged and computed again when the parameters
+    change. prints 'Error in Memo Cached' otherwise.
+    """
+    calls = []
+
+    def compute(objectives):
+        def run(specs):
+            calls.append(objectives)
+            scores = objective_score('Test_Matches_Objectives.csv',
+                                     objectives)
+            specs.append(render.chart('score.jpg', 'bar', scores))
+            return scores
+        return run
+
+    with tempfile.TemporaryDirectory() as directory:
+        cache = memo.open_cache(directory)
+        results = []
+        charts = []
+        for objectives in [['Baron'], ['Baron'], ['Dragon']]:
+            results.append(memo.cached(
+                cache, 'objective_score', ['Test_Matches_Objectives.csv'],
+                {'objectives': objectives}, compute(objectives), charts))
+    if results == [[0.6], [0.6], [0.3]] and len(charts) == 3 and (
+       calls == [['Baron'], ['Dragon']]):
+        print('Memo Cached Passed')
+    else:
+        print('Error in Memo Cached')
+        print(results, calls)
+
+
+def test_typed_tables():
+    """
+    prints 'Typed Tables Passed' if the analyses give the same results
+    when they read the typed Parquet files of the tables instead of the
+    csv files, whole and in chunks, and win rates and KDAs stay float64.
+    prints 'Error in Typed Tables' otherwise.
+    """
+    files = [('Test_Matches_Objectives.csv', 'objectives'),
+             ('Players_Gold_And_Damage.csv', 'players'),
+             ('Test_Players_KDA_And_Winrate.csv', 'kda'),
+             ('Test_Players_Region.csv', 'region')]
+    with tempfile.TemporaryDirectory() as directory:
+        paths = []
+        for filename, table in files:
+            path = os.path.join(directory, filename)
+            shutil.copy(filename, path)
+            tables.store(path, table)
+            paths.append(tables.source(path))
+        kda = tables.read_table(paths[2], 'kda')[0]
+        results = [objective_score(paths[0]),
+                   consistent_player(paths[1]),
+                   consistent_player(paths[1], 7),
+                   all_star(paths[2], paths[3]),
+                   all_star(paths[2], paths[3], 4)]
+    expected = [objective_score('Test_Matches_Objectives.csv'),
+                consistent_player('Players_Gold_And_Damage.csv'),
+                consistent_player('Players_Gold_And_Damage.csv'),
+                ['A', 'B', 'C', 'D', 'E', 'F'],
+                ['A', 'B', 'C', 'D', 'E', 'F']]
+    if all(path.endswith('.parquet') for path in paths) and (
+       results == expected) and kda['Player'].dtype == 'category' and (
+       kda['Win rate'].max() == 1.0) and (
+       kda[['Win rate', 'KDA']].dtypes == 'float64').all():
+        print('Typed Tables Passed')
+    else:
+        print('Error in Typed Tables')
+        print(results)
+
+
+def test_memory_report():
+    """
+    prints 'Memory Report Passed' if every table takes less memory with
+    the compact schema than as plain csv and the player columns are
+    categorical. prints 'Error in Memory Report' otherwise.
+    """
+    report = tables.memory_report(tables.FILES)
+    players = tables.read_table('Players_Gold_And_Damage.csv', 'players')[0]
+    stacked = stack_players(players)
+    if (report['Compact bytes'] < report['Raw bytes']).all() and (
+       stacked['Player'].dtype == 'category') and (
+       stacked['Gold'].dtype == 'float32'):
+        print('Memory Report Passed')
+    else:
+        print('Error in Memory Report')
+        print(report)
+
+
+def test_match_store():
+    """
+    prints 'Match Store Passed' if the SQLite store built from the tables
+    gives exactly the same per-player damage per gold and All-Star ranking
+    as the csv files, and a missing store is not created by reading it.
+    prints 'Error in Match Store' otherwise.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, store.STORE_FILE)
+        store.build(path)
+        report = performance_report(path, ['Uzi', 'Bang', 'Nobody'])
+        regions = all_star(path, path, 100)
+        missing = os.path.join(directory, 'typo' + store.SUFFIX)
+        try:
+            performance_report(missing)
+            refused = False
+        except FileNotFoundError:
+            refused = not os.path.exists(missing)
+    expected = performance_report('Players_Gold_And_Damage.csv',
+                                  ['Uzi', 'Bang'])
+    passed = refused and list(report) == ['Bang', 'Uzi'] and (
+             regions == all_star('Players_KDA_And_Winrate.csv',
+                                 'Players_Region.csv'))
+    for player, ratios in expected.items():
+        passed = passed and np.array_equal(report[player].to_numpy(),
+                                           ratios.to_numpy())
+    if passed:
+        print('Match Store Passed')
+    else:
+        print('Error in Match Store')
+        print(regions)
+
+
+def test_synthetic():
+    """
+    prints 'Synthetic Passed' if the synthetic tables are the same for the
+    same seed and differ for another seed, and the analyses run on them.
+    prints 'Error in Synthetic' otherwise.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        first = os.path.join(directory, 'first')
+        second = os.path.join(directory, 'second')
+        third = os.path.join(directory, 'third')
+        synthetic.generate(first, 500, 50, 3, seed=1, chunksize=200)
+        synthetic.generate(second, 500, 50, 3, seed=1, chunksize=200)
+        synthetic.generate(third, 500, 50, 3, seed=2, chunksize=200)
+        same = [pd.read_csv(os.path.join(first, filename)).equals(
+                pd.read_csv(os.path.join(other, filename)))
+                for filename, _ in tables.FILES
+                for other in [second, third]]
+        same = same == [True, False] * len(tables.FILES)
+        scores = objective_score(os.path.join(first, tables.FILES[0][0]))
+        regions = all_star(os.path.join(first, tables.FILES[2][0]),
+                           os.path.join(first, tables.FILES[3][0]))
+    if same and len(scores) == 4 and len(regions) == 6:
+        print('Synthetic Passed')
+    else:
+        print('Error in Synthetic')
+        print(scores, regions)
+
+
+def test_instrument():
+    """
+    prints 'Instrument Passed' if nothing is recorded while
+    instrumentation is disabled, and the spans of the loaded chunks and the
+    HTTP requests recorded while it is enabled show up in both reports.
+    prints 'Error in Instrument' otherwise.
+    """
+    instrument.reset()
+    list(instrument.iterate('load', tables.read_table,
+                            'Matches_Objectives.csv', 'objectives', 100))
+    instrument.http_request('https://gol.gg/game/stats/1/page-fullstats/',
+                            0.2, 100)
+    quiet = not (instrument.spans or instrument.counters)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'report.prom')
+        with instrument.profiled(path):
+            list(instrument.iterate('load', tables.read_table,
+                                    'Matches_Objectives.csv', 'objectives',
+                                    100))
+            with instrument.span('score'):
+                pass
+            instrument.http_request(
+                'https://gol.gg/game/stats/1/page-fullstats/', 0.2, 100)
+        with open(path) as file:
+            text = file.read()
+    spans = instrument.spans
+    counted = instrument.counters.get(
+        'http_bytes_total{type="fullstats"}') == 100
+    if quiet and spans['load']['count'] == 4 and spans['score']['count'] == 1 \
+            and counted and 'stage_runs_total{stage="load"} 4' in text and \
+            'http_latency_seconds_bucket{type="fullstats",le="0.25"} 1' in \
+            text and '"load"' in instrument.report_json():
+        print('Instrument Passed')
+    else:
+        print('Error in Instrument')
+        print(text)
+
+
+def test_cli():
+    """
+    prints 'CLI Passed' if the objective-score subcommand writes the same
+    objective scores as objective_score in csv and json without drawing
+    any chart, and the scrape-players subcommand writes its tables into
+    the output directory and leaves the working directory as it was.
+    prints 'Error in CLI' otherwise.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        for output_format in ['csv', 'json']:
+            with redirect_stdout(io.StringIO()):
+                cli.main(['objective-score', 'Matches_Objectives.csv',
+                          '--no-plots', '--no-cache', '--format',
+                          output_format, '--output-dir', directory])
+        csv = pd.read_csv(os.path.join(directory, 'objective_score.csv'))
+        json = pd.read_json(os.path.join(directory, 'objective_score.json'))
+        files = sorted(os.listdir(directory))
+    with fake_site(), redirect_stdout(io.StringIO()):
+        cwd = os.getcwd()
+        cli.main(['scrape-players', '--output-dir', 'scraped',
+                  '--workers', '2'])
+        scraped = os.getcwd() == cwd and os.path.exists(
+                  os.path.join('scraped', data_3.KDA_FILE))
+    scores = objective_score('Matches_Objectives.csv')
+    if np.allclose(csv['Objective Score'], scores) and np.allclose(
+            json['Objective Score'], scores) and \
+            list(csv['Objective']) == list(json['Objective']) \
+            and files == ['objective_score.csv', 'objective_score.json'] \
+            and scraped:
+        print('CLI Passed')
+    else:
+        print('Error in CLI')
+        print(csv, files)
+
+
+def test_bootstrap():
+    """
+    prints 'Bootstrap Passed' if the bootstrap intervals contain the
+    objective scores, the resample means match averaging the resampled
+    matches one by one, and the intervals are the same for the same seed
+    whatever the number of blocks and processes.
+    prints 'Error in Bootstrap' otherwise.
+    """
+    df = objective_intervals('Matches_Objectives.csv', resamples=2000)
+    scores = objective_score('Matches_Objectives.csv')
+    inside = np.allclose(df['Objective Score'], scores) and (
+             (df['Lower'] <= df['Objective Score']) &
+             (df['Objective Score'] <= df['Upper'])).all()
+    values = np.random.default_rng(0).poisson(2, (300, 3)).astype(float)
+    means = bootstrap.resample_means(values, 50, 7)
+    indices = np.random.default_rng(7).integers(300, size=(50, 300),
+                                                dtype=np.int32)
+    naive = np.array([values[rows].mean(axis=0) for rows in indices])
+    small = 20 * 300 * bootstrap.CELL_BYTES
+    one = bootstrap.intervals(values, 500, seed=3, processes=1)
+    blocks = bootstrap.intervals(values, 500, seed=3, processes=1,
+                                 max_bytes=small)
+    pooled = bootstrap.intervals(values, 500, seed=3, processes=2,
+                                 max_bytes=small)
+    other = bootstrap.intervals(values, 500, seed=4, processes=1)
+    if inside and np.allclose(means, naive) and np.array_equal(
+            blocks, pooled) and not np.array_equal(one, other) and \
+            bootstrap.block_sizes(500, 300, small) == [20] * 25:
+        print('Bootstrap Passed')
+    else:
+        print('Error in Bootstrap')
+        print(df, one, blocks, pooled)
+
+
+def test_rolling_form():
+    """
+    prints 'Rolling Form Passed' if the rolling mean and variance of a
+    player match computing every window one by one, reading the file in
+    chunks gives the same windows, and adding new games only keeps the
+    last games of every player. prints 'Error in Rolling Form' otherwise.
+    """
+    form = rolling_form('Players_Gold_And_Damage.csv', window=5)
+    chunked = rolling_form('Players_Gold_And_Damage.csv', window=5,
+                           chunksize=37)
+    uzi = form[form['Player'] == 'Uzi']
+    ratios = uzi['Dmg_Per_Gold'].to_numpy()
+    means = [ratios[max(0, i - 4):i + 1].mean() for i in range(len(ratios))]
+    variances = [ratios[max(0, i - 4):i + 1].var(ddof=1)
+                 for i in range(1, len(ratios))]
+    stats = RollingStats(3)
+    games = pd.DataFrame({'Player': ['A', 'B', 'A', 'A', 'A'],
+                          'Match': [0, 0, 1, 2, 3],
+                          'Gold': [1.0, 1.0, 1.0, 1.0, 1.0],
+                          'Damage': [1.0, 2.0, 3.0, 5.0, 7.0]})
+    stats.add(games.iloc[:3])
+    new = stats.add(games.iloc[3:])
+    if form.equals(chunked) and uzi['Match'].is_monotonic_increasing and \
+            np.allclose(uzi['Rolling_Mean'], means) and np.allclose(
+            uzi['Rolling_Variance'].iloc[1:], variances) and \
+            np.isnan(uzi['Rolling_Variance'].iloc[0]) and \
+            list(new['Rolling_Mean']) == [3.0, 5.0] and \
+            list(stats.tails['Dmg_Per_Gold']) == [2.0, 5.0, 7.0]:
+        print('Rolling Form Passed')
+    else:
+        print('Error in Rolling Form')
+        print(form.head(), new, stats.tails)
+
+
+def test_rolling_state():
+    """
+    prints 'Rolling State Passed' if a rolling form saved in a state file
+    and continued after matches are appended to the file only adds the
+    appended matches and gives the same windows as computing them all,
+    and a state saved for another window is not used.
+    prints 'Error in Rolling State' otherwise.
+    """
+    with open('Players_Gold_And_Damage.csv') as file:
+        lines = file.readlines()
+    stacked = []
+    stack = test_algorithm.stack_players
+
+    def counting(df):
+        stacked.append(len(df.index))
+        return stack(df)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'Players.csv')
+        state = os.path.join(directory, 'rolling.state')
+        with open(path, 'w') as file:
+            file.writelines(lines[:301])
+        rolling_form(path, window=5, state_file=state)
+        with open(path, 'a') as file:
+            file.writelines(lines[301:])
+        test_algorithm.stack_players = counting
+        try:
+            continued = rolling_form(path, window=5, chunksize=100,
+                                     state_file=state)
+        finally:
+            test_algorithm.stack_players = stack
+        expected = rolling_form(path, window=5)
+        other = rolling_form(path, window=3, state_file=state)
+    if continued.equals(expected) and sum(stacked) == len(lines) - 301 \
+            and other.equals(rolling_form('Players_Gold_And_Damage.csv',
+                                          window=3)):
+        print('Rolling State Passed')
+    else:
+        print('Error in Rolling State')
+        print(stacked, continued.compare(expected))
+
+
+def crash_after(calls, function):
+    """
+    Takes a number of calls and a function as parameters and returns a
+    function doing the same, except that it raises a RuntimeError once it
+    has been called that many times.
+    """
+    count = [0]
+
+    def crashing(*args, **kwargs):
+        count[0] += 1
+        if count[0] > calls:
+            raise RuntimeError('crash')
+        return function(*args, **kwargs)
+    return crashing
+
+
+def read_tables(filenames):
+    """
+    Takes a list of filenames as parameter and returns the content of
+    every file.
+    """
+    contents = []
+    for filename in filenames:
+        with open(filename) as file:
+            contents.append(file.read())
+    return contents
+
+
+@contextmanager
+def fake_site(matches=8):
+    """
+    Takes the number of matches per tournament as parameter and returns a
+    context manager that serves a fake gol.gg (see fake_golgg.py) to the
+    scrapers and runs the code it wraps in a temporary directory without
+    the page cache.
+    """
+    server, url = fake_golgg.start_server(matches=matches)
+    settings = (fetch.BASE_URL, throttle.RATE, throttle.BURST)
+    fetch.BASE_URL = url
+    throttle.RATE = throttle.BURST = 10 ** 6
+    cwd = os.getcwd()
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            os.chdir(directory)
+            try:
+                yield
+            finally:
+                os.chdir(cwd)
+    finally:
+        fetch.BASE_URL, throttle.RATE, throttle.BURST = settings
+        fetch.configure()
+        server.shutdown()
+
+
+def test_throttle():
+    """
+    prints 'Throttle Passed' if the token bucket paces requests to its rate
+    after a burst, failed requests to the fake gol.gg are retried after the
+    Retry-After it sends, requests failing every retry raise and halve the
+    adaptive limit down to its floor, and the limit is halved by a slow
+    request and grows back with fast ones. prints 'Error in Throttle'
+    otherwise.
+    """
+    settings = (throttle.RATE, throttle.BURST, throttle.BACKOFF_BASE,
+                throttle.MAX_RETRIES)
+    flaky, flaky_url = fake_golgg.start_server(failure_rate=0.2,
+                                               retry_after=0)
+    down, down_url = fake_golgg.start_server(failure_rate=1.0)
+    session = requests.Session()
+    try:
+        throttle.reset()
+        throttle.RATE, throttle.BURST = 50.0, 5
+        # Retries only stay fast when the Retry-After header is honoured
+        throttle.BACKOFF_BASE = 60.0
+        throttle.MAX_RETRIES = 10
+        start = time.perf_counter()
+        statuses = [throttle.request(session, flaky_url +
+                                     '/teams/team-stats/1/').status_code
+                    for _ in range(20)]
+        elapsed = time.perf_counter() - start
+        throttle.BACKOFF_BASE = 0.001
+        throttle.MAX_RETRIES = 3
+        try:
+            throttle.request(session, down_url + '/teams/team-stats/1/')
+            raised = False
+        except requests.HTTPError:
+            raised = True
+        floor = throttle.get_host(down_url)[1].limit
+    finally:
+        (throttle.RATE, throttle.BURST, throttle.BACKOFF_BASE,
+         throttle.MAX_RETRIES) = settings
+        throttle.reset()
+        session.close()
+        flaky.shutdown()
+        down.shutdown()
+    limit = throttle.AdaptiveLimit(4, 1, 6)
+    limits = []
+    for latency, ok in [(0.01, False), (throttle.SLOW_LATENCY, True)] + (
+                       [(0.01, True)] * 40):
+        limit.acquire()
+        limit.release(latency, ok)
+        limits.append(limit.limit)
+    if statuses == [200] * 20 and 0.3 <= elapsed < 5 and raised and (
+       floor == throttle.MIN_LIMIT) and limits[:3] == [2.0, 1.0, 2.0] and (
+       limits[-1] == 6):
+        print('Throttle Passed')
+    else:
+        print('Error in Throttle')
+        print(statuses, elapsed, raised, floor, limits)
+
+
+def store_pages(page_cache, urls):
+    """
+    Takes a page cache holding at most two 10 byte pages and three urls
+    as parameters, stores the first two pages, uses the first one again
+    and stores the third one, and returns whether every url is still
+    cached afterwards.
+    """
+    first, second, third = urls
+    page_cache.store(first, b'0' * 10, {})
+    page_cache.store(second, b'1' * 10, {})
+    os.utime(page_cache._key(first) + '.page', (1, 1))
+    os.utime(page_cache._key(second) + '.page', (2, 2))
+    page_cache.lookup(first)
+    page_cache.store(third, b'2' * 10, {})
+    return [page_cache.lookup(url) is not None for url in urls]
+
+
+def test_page_cache():
+    """
+    prints 'Page Cache Passed' if a cached page of the fake gol.gg is
+    revalidated with its ETag and not downloaded again, a page younger
+    than max_age is used without any request (also through the max_age of
+    a scraper), offline mode refuses uncached pages, and the cache evicts
+    the least recently used page first. prints 'Error in Page Cache'
+    otherwise.
+    """
+    statuses = []
+    request = throttle.request
+
+    def recording(*args):
+        response = request(*args)
+        statuses.append(response.status_code)
+        return response
+    throttle.request = recording
+    try:
+        with fake_site():
+            url = fetch.BASE_URL + '/teams/team-stats/1/'
+            fetch.configure('cache')
+            pages = [fetch.get_page(url), fetch.get_page(url)]
+            fetch.configure('cache', max_age=3600)
+            pages.append(fetch.get_page(url))
+            revalidated = list(statuses)
+            fetch.configure('cache', offline=True)
+            try:
+                fetch.get_page(fetch.BASE_URL + '/teams/team-stats/2/')
+                refused = False
+            except fetch.OfflineCacheMiss:
+                refused = True
+            data_3.main(cache_dir='cache', workers=2)
+            requests_made = len(statuses)
+            data_3.main(cache_dir='cache', workers=2, max_age=3600)
+            reused = len(statuses) == requests_made
+            lru = store_pages(PageCache('lru', 25), ['a', 'b', 'c'])
+    finally:
+        throttle.request = request
+    if revalidated == [200, 304] and pages[0] == pages[1] == pages[2] and (
+       refused and reused and lru == [True, False, True]):
+        print('Page Cache Passed')
+    else:
+        print('Error in Page Cache')
+        print(revalidated, refused, reused, lru)
+
+
+def test_resume():
+    """
+    prints 'Resume Passed' if a crawl of the fake gol.gg that crashes in
+    the middle of a batch and is resumed writes the same tables as a crawl
+    that never crashed, and a failed crawl of the players tables leaves
+    the previous tables untouched. prints 'Error in Resume' otherwise.
+    """
+    match_files = [data_1_and_2.OBJECTIVE_FILE, data_1_and_2.PLAYERS_FILE]
+    player_files = [data_3.KDA_FILE, data_3.REGION_FILE]
+    bo1_objective = data_1_and_2.bo1_objective
+    try:
+        with fake_site():
+            data_1_and_2.main(cache_dir=None, resume=False)
+            clean = read_tables(match_files)
+            os.remove(data_1_and_2.MANIFEST_FILE)
+            data_1_and_2.bo1_objective = crash_after(20, bo1_objective)
+            try:
+                data_1_and_2.main(cache_dir=None)
+            except RuntimeError:
+                pass
+            data_1_and_2.bo1_objective = bo1_objective
+            data_1_and_2.main(cache_dir=None)
+            resumed = read_tables(match_files)
+            data_3.main(cache_dir=None)
+            before = read_tables(player_files)
+            try:
+                data_3.main(cache_dir='empty_cache', offline=True)
+            except fetch.OfflineCacheMiss:
+                pass
+            after = read_tables(player_files)
+            leftovers = [name for name in os.listdir('.')
+                         if name.endswith('.part')]
+    finally:
+        data_1_and_2.bo1_objective = bo1_objective
+    if clean == resumed and before == after and len(before[0]) > 0 and \
+            not leftovers:
+        print('Resume Passed')
+    else:
+        print('Error in Resume')
+        print([len(table.splitlines()) for table in clean + resumed])
+
+
+def test_two_stage():
+    """
+    prints 'Two Stage Passed' if the tables parsed from the page archive
+    match a normal crawl and a crawl resuming after the parse stage adds
+    no rows, even when the manifest was stale before the parse stage.
+    prints 'Error in Two Stage' otherwise.
+    """
+    match_files = [data_1_and_2.OBJECTIVE_FILE, data_1_and_2.PLAYERS_FILE]
+    with fake_site():
+        data_1_and_2.main(cache_dir=None, resume=False)
+        crawled = read_tables(match_files)
+        with open(data_1_and_2.MANIFEST_FILE) as file:
+            stale = file.readlines()[:3]
+        with open(data_1_and_2.MANIFEST_FILE, 'w') as file:
+            file.writelines(stale)
+        data_1_and_2.main(cache_dir=None, stage='fetch')
+        data_1_and_2.main(cache_dir=None, stage='parse', processes=1)
+        parsed = read_tables(match_files)
+        data_1_and_2.main(cache_dir=None)
+        resumed = read_tables(match_files)
+    if crawled == parsed == resumed:
+        print('Two Stage Passed')
+    else:
+        print('Error in Two Stage')
+        print([len(table.splitlines()) for table in crawled + resumed])
+
+
+def test_scraped_tables():
+    """
+    prints 'Scraped Tables Passed' if the gold and damage table scraped
+    from the fake gol.gg goes through its Parquet file into the analyses,
+    a table with the old misspelled damage columns is read the same way
+    and a table missing a column is refused.
+    prints 'Error in Scraped Tables' otherwise.
+    """
+    with fake_site():
+        data_1_and_2.main(cache_dir=None, resume=False)
+        stored = os.path.exists(tables.table_path(data_1_and_2.PLAYERS_FILE))
+        games = len(performance_report(data_1_and_2.PLAYERS_FILE))
+        df = pd.read_csv(data_1_and_2.PLAYERS_FILE)
+        df.columns = [column.replace('_Damage', '_Danmage')
+                      for column in df.columns]
+        old = tables.typed(df, 'players')
+        try:
+            tables.typed(df.drop(columns='Top_B_Danmage'), 'players')
+            refused = False
+        except ValueError:
+            refused = True
+    if stored and games > 0 and refused and 'Top_B_Damage' in old.columns:
+        print('Scraped Tables Passed')
+    else:
+        print('Error in Scraped Tables')
+
+
 def main():
     process_file('Matches_Objectives.csv')
     process_file('Players_Gold_And_Damage.csv')
 
     test_objective_score()
+    test_objective_subset()
     test_consistent_player()
+    test_player_stats_merge()
+    test_performance_report()
     test_all_star()
+    test_chunked()
+    test_render_charts()
+    test_memo_cached()
+    test_typed_tables()
+    test_memory_report()
+    test_match_store()
+    test_synthetic()
+    test_instrument()
+    test_cli()
+    test_bootstrap()
+    test_rolling_form()
+    test_rolling_state()
+    test_throttle()
+    test_page_cache()
+    test_resume()
+    test_two_stage()
+    test_scraped_tables()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,165 @@
+'''
+Implements the request scheduler used by fetch.py. Requests to every host
+are paced by a token bucket, limited by a concurrency limit that adapts
+to the latency and errors of that host (additive increase, multiplicative
+decrease), given a timeout and retried with jittered exponential backoff
+when they fail or the server answers with a 429 or 5xx status.
+'''
+from urllib.parse import urlsplit
+import random
+import threading
+import time
+import requests
+import instrument
+
+RATE = 10.0
+BURST = 10
+TIMEOUT = 20
+MAX_RETRIES = 5
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 30.0
+RETRY_STATUS = {429, 500, 502, 503, 504}
+MIN_LIMIT = 1
+MAX_LIMIT = 16
+SLOW_LATENCY = 5.0
+
+_hosts = {}
+_hosts_lock = threading.Lock()
+
+
+class TokenBucket:
+    '''
+    Lets at most rate requests per second through on average, with bursts
+    of up to burst requests.
+    '''
+
+    def __init__(self, rate=RATE, burst=BURST):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        '''
+        Wait until a token is available and take it.
+        '''
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (
+                                   now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class AdaptiveLimit:
+    '''
+    Limits the number of requests in flight to a host. The limit grows by
+    one every time a full limit of requests succeeds quickly and is halved
+    when a request fails or is slower than SLOW_LATENCY seconds.
+    '''
+
+    def __init__(self, limit=MAX_LIMIT // 2, low=MIN_LIMIT, high=MAX_LIMIT):
+        self.limit = float(limit)
+        self.low = low
+        self.high = high
+        self.in_flight = 0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        '''
+        Wait until fewer requests than the limit are in flight and start one.
+        '''
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+
+    def release(self, latency, ok):
+        '''
+        Take the latency of a finished request in seconds and whether it
+        succeeded as parameters, end that request and adapt the limit.
+        '''
+        with self._condition:
+            self.in_flight -= 1
+            if ok and latency < SLOW_LATENCY:
+                self.limit = min(self.high, self.limit + 1 / self.limit)
+            else:
+                self.limit = max(self.low, self.limit / 2)
+            self._condition.notify_all()
+
+
+def get_host(url):
+    '''
+    Take a url as parameter and return the token bucket and the adaptive
+    limit of its host, creating them the first time the host is seen.
+    '''
+    host = urlsplit(url).netloc
+    with _hosts_lock:
+        if host not in _hosts:
+            _hosts[host] = (TokenBucket(RATE, BURST),
+                            AdaptiveLimit(MAX_LIMIT // 2, MIN_LIMIT,
+                                          MAX_LIMIT))
+        return _hosts[host]
+
+
+def reset():
+    '''
+    Forget the token buckets and limits of every host, so they are created
+    again with the current settings.
+    '''
+    with _hosts_lock:
+        _hosts.clear()
+
+
+def backoff(attempt, response=None):
+    '''
+    Take the number of the failed attempt and the response it got, if any,
+    as parameters and return how many seconds to wait before the next one,
+    honouring a Retry-After header sent with the response.
+    '''
+    if response is not None:
+        retry_after = response.headers.get('Retry-After', '')
+        if retry_after.isdigit():
+            return min(BACKOFF_CAP, float(retry_after))
+    delay = min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt)
+    return random.uniform(delay / 2, delay)
+
+
+def request(session, url, headers=None):
+    '''
+    Take a requests session, a url and the headers to send as parameters
+    and return the response of a GET request to that url, pacing and
+    retrying it as described above. Raises the last error, or an HTTPError
+    for the last bad status, once MAX_RETRIES retries have failed.
+    '''
+    bucket, limit = get_host(url)
+    for attempt in range(MAX_RETRIES + 1):
+        bucket.acquire()
+        limit.acquire()
+        start = time.monotonic()
+        response = None
+        try:
+            response = session.get(url, headers=headers, timeout=TIMEOUT)
+        except requests.RequestException:
+            instrument.count('http_errors_total')
+            if attempt == MAX_RETRIES:
+                limit.release(time.monotonic() - start, False)
+                raise
+        latency = time.monotonic() - start
+        if instrument.ENABLED and response is not None:
+            instrument.http_request(url, latency, len(response.content))
+        ok = response is not None and (
+             response.status_code not in RETRY_STATUS)
+        limit.release(latency, ok)
+        if ok:
+            return response
+        if attempt == MAX_RETRIES:
+            response.raise_for_status()
+        instrument.count('http_retries_total')
+        time.sleep(backoff(attempt, response))